@@ -0,0 +1,298 @@
+"""
+Walk-forward (rolling-origin) backtesting of the radial error models.
+
+Every day after the first `min_train_days` becomes one fold: the model is
+trained on all windows whose targets end before that day starts and
+evaluated on the windows whose forecast origin falls in it. The series is
+scaled and windowed once (strided views) and every fold slices the same view.
+
+By default folds warm-start: fold k continues from fold k-1's weights for a
+few epochs instead of retraining from scratch, so the folds run in order.
+With --replay a warm fold only sees the windows new since the previous fold
+plus a replay buffer of older ones (the same refresh as finetune_model).
+With --cold each fold trains from scratch and the folds run in a process pool.
+
+    python backtest.py --model LSTM --dataset GEO [--folds 4] [--replay | --cold --workers 4]
+"""
+import json
+import os
+import time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from src import preprocessing
+from src.finetune import finetune, update_replay
+from src.residuals import ResidualStats
+
+DATASETS = {
+    'GEO': "./data/DATA_GEO_Train.csv",
+    'MEO1': "./data/DATA_MEO_Train.csv",
+    'MEO2': "./data/DATA_MEO_Train2.csv",
+}
+
+
+# -------------------------------
+# Folds over one shared windowed view
+# -------------------------------
+def day_starts(index):
+    """Row positions where each calendar day starts (sorted DatetimeIndex)"""
+    days = index.normalize().asi8
+    return np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+
+
+def make_folds(index, seq_length, n_future, n_folds=None, min_train_days=2):
+    """
+    One fold per day after `min_train_days`, as window index ranges:
+    train windows [0, train_stop) end before the day starts, test windows
+    [test_start, test_stop) have their first target inside the day.
+    """
+    starts = day_starts(index)
+    ends = np.r_[starts[1:], len(index)]
+    n_windows = len(index) - seq_length - n_future + 1
+
+    folds = []
+    for d in range(min_train_days, len(starts)):
+        origin, end = int(starts[d]), int(ends[d])
+        train_stop = origin - seq_length - n_future + 1
+        test_start, test_stop = max(origin - seq_length, 0), min(end - seq_length, n_windows)
+        if train_stop < 10 or test_stop <= test_start:
+            continue
+        folds.append({
+            'day': str(index[origin].date()),
+            'origin': origin,
+            'train_stop': train_stop,
+            'test_start': test_start,
+            'test_stop': test_stop,
+        })
+
+    if n_folds:
+        folds = folds[-n_folds:]
+    for i, fold in enumerate(folds):
+        fold['fold'] = i
+    return folds
+
+
+def load_series(data_path, dataset_name, n_folds=None, min_train_days=2):
+    """Scale and window a dataset once; scalers only see rows before the first fold"""
+    df = preprocessing.add_features(preprocessing.load_and_preprocess(data_path))
+    seq_length, n_future = preprocessing.window_lengths(dataset_name)
+
+    folds = make_folds(df.index, seq_length, n_future, n_folds, min_train_days)
+    if not folds:
+        raise ValueError(f"{dataset_name}: not enough days for a backtest")
+
+    _, X, _, y, f_scaler, t_scaler = preprocessing.scale_data(
+        df.iloc[:folds[0]['origin']], df,
+        feature_cols=preprocessing.FEATURE_COLS,
+        target_col=preprocessing.TARGET_COL
+    )
+    X_seq, y_seq = preprocessing.create_sequences(X, y, seq_length, n_future)
+
+    return {
+        'X_seq': X_seq,
+        'y_seq': y_seq,
+        'target_scaler': t_scaler,
+        'folds': folds,
+        'seq_length': seq_length,
+        'n_future': n_future,
+    }
+
+
+# -------------------------------
+# Training / evaluation per fold
+# -------------------------------
+def _model_class(model_name):
+    from src.registry import MODEL_CLASSES
+
+    if model_name.lower() not in MODEL_CLASSES or model_name.lower() == 'clock':
+        raise ValueError(f"Can't backtest {model_name}: radial error models only")
+    return MODEL_CLASSES[model_name.lower()]
+
+
+def fit_and_predict(model, series, fold, epochs, batch_size=8, replay=None, new_from=0):
+    """
+    Train `model` on the fold's training windows, predict its test windows (in meters).
+    With a `replay` buffer only windows [new_from, train_stop) plus the buffer are used.
+    """
+    n_train = fold['train_stop']
+    start = time.perf_counter()
+    if replay is None:
+        history = model.train(series['X_seq'][:n_train], series['y_seq'][:n_train],
+                              epochs=epochs, batch_size=batch_size)
+    else:
+        n_train = n_train - new_from
+        history = finetune(model, series['X_seq'][new_from:fold['train_stop']],
+                           series['y_seq'][new_from:fold['train_stop']], replay,
+                           epochs=epochs, batch_size=batch_size)
+    fit_time = time.perf_counter() - start
+
+    test = slice(fold['test_start'], fold['test_stop'])
+    y_pred = model.predict(series['X_seq'][test])
+
+    t_scaler = series['target_scaler']
+    shape = series['y_seq'][test].shape
+    y_true = t_scaler.inverse_transform(series['y_seq'][test].reshape(-1, 1)).reshape(shape)
+    y_pred = t_scaler.inverse_transform(y_pred.reshape(-1, 1)).reshape(shape)
+
+    return {
+        **fold,
+        'n_train': n_train,
+        'n_test': shape[0],
+        'epochs': len(history.history['loss']),
+        'fit_time': fit_time,
+        'y_true': y_true,
+        'y_pred': y_pred,
+    }
+
+
+def _cold_fold(model_name, data_path, dataset_name, n_folds, min_train_days, fold_index, epochs):
+    # Runs in a worker: the series comes from the ingest cache, the model from scratch
+    series = load_series(data_path, dataset_name, n_folds, min_train_days)
+    model = _model_class(model_name)(input_shape=series['X_seq'].shape[1:],
+                                     output_steps=series['n_future'])
+    return fit_and_predict(model, series, series['folds'][fold_index], epochs)
+
+
+def fold_stats(y_true, y_pred):
+    """(ResidualStats, per-step absolute error sums) of one fold's (n_windows, n_future) arrays"""
+    err = y_true - y_pred
+    return ResidualStats.from_residuals(err, seed=0), np.abs(err).sum(axis=0)
+
+
+def error_metrics(res_stats, abs_sum):
+    """Overall and per-horizon-step RMSE / MAE, residual moments and normality from merged stats"""
+    overall = res_stats.pooled()
+    return {
+        'rmse': float(overall.rmse[0]),
+        'mae': float(abs_sum.sum() / overall.n[0]),
+        'rmse_by_step': res_stats.rmse.round(6).tolist(),
+        'mae_by_step': (abs_sum / res_stats.n).round(6).tolist(),
+        'shapiro_p': float(res_stats.shapiro()[1]),
+        'residuals': res_stats.to_dict(),
+    }
+
+
+def walk_forward(model_name, dataset_name, data_path=None, n_folds=None, min_train_days=2,
+                 epochs=100, warm_epochs=15, warm_start=True, replay=False, workers=None, threads=None):
+    """
+    Backtest one model on one dataset; returns per-fold and pooled metrics.
+
+    warm_start=True trains the first fold for `epochs` and each later fold
+    for `warm_epochs` starting from the previous fold's weights (replay=True:
+    on the new windows plus a replay buffer only). Otherwise every fold
+    trains from scratch in a process pool of `workers`.
+    """
+    data_path = data_path or DATASETS[dataset_name]
+    series = load_series(data_path, dataset_name, n_folds, min_train_days)
+    folds = series['folds']
+    mode = ('replay' if replay else 'warm-start') if warm_start else 'cold'
+    print(f"Backtesting {model_name} on {dataset_name}: {len(folds)} folds, {mode}")
+
+    start = time.perf_counter()
+    results = []
+    if warm_start:
+        model = _model_class(model_name)(input_shape=series['X_seq'].shape[1:],
+                                         output_steps=series['n_future'])
+        buffer, prev_stop = None, 0
+        for fold in folds:
+            if fold['fold'] == 0 or not replay:
+                res = fit_and_predict(model, series, fold, epochs if fold['fold'] == 0 else warm_epochs)
+            else:
+                res = fit_and_predict(model, series, fold, warm_epochs, replay=buffer, new_from=prev_stop)
+            if replay:
+                new = slice(prev_stop, fold['train_stop'])
+                buffer = update_replay(buffer, series['X_seq'][new], series['y_seq'][new])
+                prev_stop = fold['train_stop']
+            results.append(res)
+            print(f"  fold {fold['fold']} ({fold['day']}): {res['epochs']} epochs in {res['fit_time']:.1f}s")
+    else:
+        from orchestrator import _init_worker
+
+        cpus = os.cpu_count() or 1
+        workers = min(workers or cpus, len(folds))
+        threads = threads or max(1, cpus // workers)
+
+        ctx = mp.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=(threads,)) as pool:
+            futures = [pool.submit(_cold_fold, model_name, data_path, dataset_name,
+                                   n_folds, min_train_days, fold['fold'], epochs)
+                       for fold in folds]
+            for future in as_completed(futures):
+                res = future.result()
+                results.append(res)
+                print(f"  fold {res['fold']} ({res['day']}): {res['epochs']} epochs in {res['fit_time']:.1f}s")
+        results.sort(key=lambda r: r['fold'])
+
+    elapsed = time.perf_counter() - start
+
+    # Fold stats merge into the overall ones without re-reading the residuals
+    fold_reports = []
+    total, total_abs = ResidualStats(series['n_future'], seed=0), 0.0
+    for res in results:
+        res_stats, abs_sum = fold_stats(res['y_true'], res['y_pred'])
+        total.merge(res_stats)
+        total_abs = total_abs + abs_sum
+
+        report = {k: v for k, v in res.items() if k not in ('y_true', 'y_pred')}
+        report.update(error_metrics(res_stats, abs_sum))
+        fold_reports.append(report)
+
+    return {
+        'model': model_name,
+        'dataset': dataset_name,
+        'mode': mode,
+        'seq_length': series['seq_length'],
+        'n_future': series['n_future'],
+        'elapsed': elapsed,
+        'folds': fold_reports,
+        'overall': error_metrics(total, total_abs),
+    }
+
+
+def print_report(report):
+    print(f"\nBACKTEST - {report['model']} on {report['dataset']} ({report['mode']}, {report['elapsed']:.1f}s)")
+    print(f"  {'fold':<5}{'day':<12}{'train':>7}{'test':>6}{'epochs':>8}{'RMSE (m)':>10}{'MAE (m)':>10}")
+    for f in report['folds']:
+        print(f"  {f['fold']:<5}{f['day']:<12}{f['n_train']:>7}{f['n_test']:>6}{f['epochs']:>8}"
+              f"{f['rmse']:>10.4f}{f['mae']:>10.4f}")
+    overall = report['overall']
+    print(f"  overall RMSE {overall['rmse']:.4f}m, MAE {overall['mae']:.4f}m, Shapiro p {overall['shapiro_p']:.4f}")
+
+    # First / middle / last horizon step
+    steps = overall['rmse_by_step']
+    for i in sorted({0, len(steps) // 2, len(steps) - 1}):
+        print(f"  step {i + 1:>3}: RMSE {steps[i]:.4f}m, MAE {overall['mae_by_step'][i]:.4f}m")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Walk-forward backtest")
+    parser.add_argument('--model', default='LSTM')
+    parser.add_argument('--dataset', default=None, help="GEO, MEO1 or MEO2 (default: all)")
+    parser.add_argument('--folds', type=int, default=None, help="last N folds only")
+    parser.add_argument('--min-train-days', type=int, default=2)
+    parser.add_argument('--epochs', type=int, default=100)
+    parser.add_argument('--warm-epochs', type=int, default=15)
+    parser.add_argument('--replay', action='store_true',
+                        help="warm folds train on new windows + a replay buffer only")
+    parser.add_argument('--cold', action='store_true', help="retrain every fold from scratch, in parallel")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--threads', type=int, default=None)
+    args = parser.parse_args()
+
+    os.makedirs('results/backtest', exist_ok=True)
+    for dataset_name in ([args.dataset] if args.dataset else DATASETS):
+        report = walk_forward(args.model, dataset_name, n_folds=args.folds,
+                              min_train_days=args.min_train_days, epochs=args.epochs,
+                              warm_epochs=args.warm_epochs, warm_start=not args.cold, replay=args.replay,
+                              workers=args.workers, threads=args.threads)
+        print_report(report)
+
+        path = f"results/backtest/{args.model.lower()}_{dataset_name}_{report['mode']}.json"
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=1)
+        print(f"  ✓ Report saved to {path}")
@@ -0,0 +1 @@
+"""Offline CPU benchmarks for the preprocessing -> training -> inference path (python -m benchmarks.run)"""
@@ -0,0 +1,68 @@
+"""
+Compare two benchmark result files (python -m benchmarks.run output):
+
+    python -m benchmarks.compare OLD.json NEW.json [--threshold 0.10] [--metric wall_ms] [--fail]
+
+Results are matched on stage, name and parameters. A ratio above
+1 + threshold is flagged as slower (or bigger, for memory metrics);
+--fail exits non-zero when anything is flagged.
+"""
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def result_key(result):
+    params = ','.join(f"{k}={v}" for k, v in sorted(result['params'].items()))
+    return f"{result['stage']}/{result['name']}" + (f"[{params}]" if params else '')
+
+
+def compare(old, new, metric='wall_ms', threshold=0.10):
+    """[(key, old value, new value, ratio, flag)] for results present in both runs"""
+    before = {result_key(r): r['metrics'] for r in old['results']}
+    rows = []
+    for result in new['results']:
+        key = result_key(result)
+        a, b = before.get(key, {}).get(metric), result['metrics'].get(metric)
+        if a is None or b is None:
+            continue
+        ratio = b / a if a else float('inf')
+        flag = 'REGRESSED' if ratio > 1 + threshold else ('improved' if ratio < 1 - threshold else '')
+        rows.append((key, a, b, ratio, flag))
+    return rows
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare two benchmark runs")
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--metric', default='wall_ms', help="wall_ms, cpu_ms, traced_peak_mb, rss_growth_mb, ...")
+    parser.add_argument('--threshold', type=float, default=0.10, help="relative change that gets flagged")
+    parser.add_argument('--fail', action='store_true', help="exit 1 when anything regressed")
+    args = parser.parse_args(argv)
+
+    old, new = load(args.old), load(args.new)
+    print(f"{old.get('commit')} -> {new.get('commit')}  ({args.metric}, threshold {args.threshold:.0%})")
+    if old.get('environment') != new.get('environment'):
+        print("  note: environments differ, ratios may not be comparable")
+
+    rows = compare(old, new, args.metric, args.threshold)
+    width = max((len(r[0]) for r in rows), default=10)
+    for key, a, b, ratio, flag in rows:
+        print(f"  {key:<{width}} {a:>12.3f} {b:>12.3f} {ratio:>7.2f}x  {flag}")
+
+    regressed = [r for r in rows if r[4] == 'REGRESSED']
+    print(f"\n{len(rows)} compared, {len(regressed)} regressed, "
+          f"{sum(r[4] == 'improved' for r in rows)} improved")
+    if args.fail and regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
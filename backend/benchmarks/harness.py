@@ -0,0 +1,85 @@
+import gc
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.instrument import nbytes, peak_rss_mb
+
+
+def measure(fn, repeat=5, warmup=1, trace_memory=True):
+    """
+    Time `fn()` `repeat` times after `warmup` calls.
+
+    Wall and CPU (all threads) times are per call. Memory comes from one
+    extra traced call, so tracemalloc's overhead doesn't skew the timings;
+    it sees NumPy / pandas allocations but not TensorFlow's, which show up
+    in the process peak RSS instead.
+    """
+    out = None
+    for _ in range(warmup):
+        out = fn()
+
+    rss_before = peak_rss_mb()
+    walls, cpus = [], []
+    for _ in range(repeat):
+        gc.collect()
+        t0, c0 = time.perf_counter(), time.process_time()
+        out = fn()
+        walls.append(time.perf_counter() - t0)
+        cpus.append(time.process_time() - c0)
+
+    traced = None
+    if trace_memory:
+        gc.collect()
+        tracemalloc.start()
+        out = fn()
+        traced = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+    walls, cpus = np.array(walls) * 1e3, np.array(cpus) * 1e3
+    return {
+        'repeat': repeat,
+        'wall_ms': round(float(np.median(walls)), 4),
+        'wall_min_ms': round(float(walls.min()), 4),
+        'wall_iqr_ms': round(float(np.subtract(*np.percentile(walls, [75, 25]))), 4),
+        'cpu_ms': round(float(np.median(cpus)), 4),
+        'traced_peak_mb': None if traced is None else round(traced, 3),
+        'rss_peak_mb': round(peak_rss_mb(), 1),
+        'rss_growth_mb': round(peak_rss_mb() - rss_before, 1),
+        'output_mb': round(nbytes(out) / 2**20, 3),
+    }
+
+
+def git_state(cwd):
+    """(commit, dirty) of the working tree, or (None, None) outside git"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=cwd, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=cwd,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def environment():
+    import pandas as pd
+    import sklearn
+
+    env = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+    }
+    if 'tensorflow' in sys.modules:
+        env['tensorflow'] = sys.modules['tensorflow'].__version__
+    return env
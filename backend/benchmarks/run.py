@@ -0,0 +1,379 @@
+"""
+Benchmark the pipeline stages on synthetic satellites plus the bundled data/*.csv.
+
+Each stage is timed (median wall / CPU time over --repeat calls after a
+warmup) and memory-profiled. Results go to one JSON file tagged with the
+git commit, so runs from two commits can be diffed:
+
+    python -m benchmarks.run [--satellites 3] [--days 7] [--stages ingest,windowing] [--quick]
+    python -m benchmarks.compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+
+Stages: ingest, features, windowing, fit (per epoch), predict (batch 1 /
+batch N), mc_dropout, api. Runs offline on CPU (GPUs are hidden), and
+TensorFlow is only imported by the model and API stages.
+"""
+import os
+
+# Before anything can import TensorFlow
+os.environ.setdefault('CUDA_VISIBLE_DEVICES', '-1')
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+import json
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from src import preprocessing
+from src.instrument import peak_rss_mb
+from src.online_features import OnlineFeatureEngine
+
+from .harness import environment, git_state, measure
+from .synthetic import write_constellation
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STAGES = ('ingest', 'features', 'windowing', 'fit', 'predict', 'mc_dropout', 'api')
+
+
+class Bench:
+    """Datasets, shared intermediate results and the records of one benchmark run"""
+
+    def __init__(self, args, workdir):
+        self.args = args
+        self.workdir = workdir
+        self.records = []
+        self.datasets = write_constellation(os.path.join(workdir, 'data'), args.satellites, args.days,
+                                            args.sample_minutes, seed=args.seed)
+        if not args.no_bundled:
+            for path, name in (("data/DATA_GEO_Train.csv", "GEO"), ("data/DATA_MEO_Train.csv", "MEO1"),
+                               ("data/DATA_MEO_Train2.csv", "MEO2")):
+                path = os.path.join(BACKEND_DIR, path)
+                if os.path.exists(path):
+                    self.datasets[name] = path
+        self._frames = {}
+        self._scaled = {}
+        self.models = {}
+
+    def record(self, stage, name, metrics, **params):
+        self.records.append({'stage': stage, 'name': name, 'params': params, 'metrics': metrics})
+        wall = metrics.get('wall_ms')
+        extra = ', '.join(f"{k}={v}" for k, v in params.items())
+        print(f"  {stage:<10} {name:<22} {wall if wall is not None else '-':>10} ms  {extra}")
+
+    def measure(self, stage, name, fn, **params):
+        try:
+            metrics = measure(fn, repeat=params.pop('repeat', self.args.repeat),
+                              warmup=params.pop('warmup', 1),
+                              trace_memory=params.pop('trace_memory', True))
+        except Exception as e:
+            metrics = {'error': f"{type(e).__name__}: {e}"}
+        self.record(stage, name, metrics, **params)
+
+    # Untimed inputs shared by the stages
+    def frame(self, name):
+        if name not in self._frames:
+            self._frames[name] = preprocessing.load_and_preprocess(self.datasets[name], cache=False)
+        return self._frames[name]
+
+    def scaled(self, name):
+        if name not in self._scaled:
+            df_train, df_test = preprocessing.split_train_test(preprocessing.add_features(self.frame(name).copy()))
+            self._scaled[name] = preprocessing.scale_data(df_train, df_test, preprocessing.FEATURE_COLS,
+                                                          preprocessing.TARGET_COL)
+        return self._scaled[name]
+
+    def windows(self):
+        """Contiguous training windows of the first synthetic satellite (the model stages' input)"""
+        X_train, _, y_train, *_ = self.scaled('SYN0')
+        seq_length, n_future = preprocessing.window_lengths('SYN0')
+        return preprocessing.create_sequences(X_train, y_train, seq_length, n_future, copy=True)
+
+    def model(self, model_name):
+        """Fitted model from the fit stage, or a freshly built one (timings don't depend on weights)"""
+        if model_name not in self.models:
+            from src.registry import MODEL_CLASSES
+
+            X, y = self.windows()
+            self.models[model_name] = MODEL_CLASSES[model_name.lower()](
+                input_shape=X.shape[1:], output_steps=y.shape[1])
+        return self.models[model_name]
+
+
+# -------------------------------
+# Stages
+# -------------------------------
+def stage_ingest(bench):
+    cache_dir = os.path.join(bench.workdir, 'cache')
+    for name, path in bench.datasets.items():
+        bench.measure('ingest', 'read_raw', lambda: preprocessing.read_raw(path), dataset=name)
+        bench.measure('ingest', 'load_csv', lambda: preprocessing.load_and_preprocess(path, cache=False),
+                      dataset=name, rows=len(bench.frame(name)))
+        # The warmup call writes the cache
+        bench.measure('ingest', 'load_cached',
+                      lambda: preprocessing.load_and_preprocess(path, cache_dir=cache_dir), dataset=name)
+
+
+def stage_features(bench):
+    for name in bench.datasets:
+        df = bench.frame(name)
+        bench.measure('features', 'add_features', lambda: preprocessing.add_features(df.copy()), dataset=name)
+        bench.measure('features', 'add_temporal', lambda: preprocessing.add_temporal_features(df.copy()),
+                      dataset=name)
+        bench.measure('features', 'online_replay', lambda: OnlineFeatureEngine().replay(df), dataset=name)
+
+        feats = preprocessing.add_features(df.copy())
+        bench.measure('features', 'split_train_test', lambda: preprocessing.split_train_test(feats), dataset=name)
+        df_train, df_test = preprocessing.split_train_test(feats)
+        bench.measure('features', 'scale_data',
+                      lambda: preprocessing.scale_data(df_train, df_test, preprocessing.FEATURE_COLS,
+                                                       preprocessing.TARGET_COL),
+                      dataset=name)
+
+
+def stage_windowing(bench):
+    for name in bench.datasets:
+        X_train, _, y_train, *_ = bench.scaled(name)
+        seq_length, n_future = preprocessing.window_lengths(name)
+        params = dict(dataset=name, seq_length=seq_length, n_future=n_future)
+
+        bench.measure('windowing', 'create_sequences',
+                      lambda: preprocessing.create_sequences(X_train, y_train, seq_length, n_future), **params)
+        bench.measure('windowing', 'create_sequences_copy',
+                      lambda: preprocessing.create_sequences(X_train, y_train, seq_length, n_future, copy=True),
+                      **params)
+        Xs, _ = preprocessing.create_sequences(X_train, y_train, seq_length, n_future)
+        bench.measure('windowing', 'materialize_batch',
+                      lambda: preprocessing.materialize(Xs, 0, bench.args.batch), batch=bench.args.batch, **params)
+
+
+def stage_fit(bench):
+    import tensorflow as tf
+
+    class EpochTimer(tf.keras.callbacks.Callback):
+        def on_train_begin(self, logs=None):
+            self.times = []
+
+        def on_epoch_begin(self, epoch, logs=None):
+            self._start = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            self.times.append(time.perf_counter() - self._start)
+
+    X, y = bench.windows()
+    for model_name in bench.args.models:
+        tf.keras.utils.set_random_seed(bench.args.seed)
+        try:
+            model = bench.model(model_name)
+            timer = EpochTimer()
+            rss_before = peak_rss_mb()
+            cpu = time.process_time()
+            model.model.fit(X, y, epochs=bench.args.epochs, batch_size=8, verbose=0, callbacks=[timer])
+            cpu = time.process_time() - cpu
+
+            # The first epoch also traces the graph; report it separately
+            times = np.array(timer.times) * 1e3
+            steady = times[1:] if len(times) > 1 else times
+            metrics = {
+                'repeat': len(steady),
+                'wall_ms': round(float(np.median(steady)), 4),
+                'wall_min_ms': round(float(steady.min()), 4),
+                'first_epoch_ms': round(float(times[0]), 4),
+                'cpu_ms': round(cpu * 1e3 / len(times), 4),
+                'rss_peak_mb': round(peak_rss_mb(), 1),
+                'rss_growth_mb': round(peak_rss_mb() - rss_before, 1),
+                'params': int(model.model.count_params()),
+            }
+        except Exception as e:
+            metrics = {'error': f"{type(e).__name__}: {e}"}
+        bench.record('fit', 'epoch', metrics, model=model_name, windows=len(X), batch_size=8)
+
+
+def stage_predict(bench):
+    import tensorflow as tf
+
+    X, _ = bench.windows()
+    X1, XN = X[:1].astype(np.float32), X[:bench.args.batch]
+    for model_name in bench.args.models:
+        model = bench.model(model_name)
+        # Same compiled forward pass the API serves with (src.serving.ForecastModel)
+        forward = tf.function(lambda x: model.model(x, training=False),
+                              input_signature=[tf.TensorSpec((None,) + X.shape[1:], tf.float32)])
+        bench.measure('predict', 'predict_b1', lambda: model.predict(X1), model=model_name,
+                      trace_memory=False)
+        bench.measure('predict', 'serve_b1', lambda: forward(X1).numpy(), model=model_name,
+                      trace_memory=False)
+        bench.measure('predict', 'predict_bN', lambda: model.predict(XN), model=model_name, batch=len(XN),
+                      trace_memory=False)
+        bench.measure('predict', 'predict_all', lambda: model.predict(X), model=model_name, batch=len(X),
+                      trace_memory=False)
+
+
+def stage_mc_dropout(bench):
+    from src.uncertainty import mc_dropout_predict
+
+    X, _ = bench.windows()
+    n_iter = bench.args.mc_iter
+    for model_name in bench.args.models:
+        model = bench.model(model_name)
+        for batch in (1, bench.args.batch):
+            bench.measure('mc_dropout', 'mc_dropout_predict',
+                          lambda: mc_dropout_predict(model, X[:batch], n_iter=n_iter),
+                          model=model_name, batch=min(batch, len(X)), n_iter=n_iter, trace_memory=False)
+
+
+def stage_api(bench):
+    try:
+        import server
+    except ImportError as e:
+        bench.record('api', 'import', {'error': f"server unavailable: {e}"})
+        return
+    from plot_cache import PlotCache
+    from results_store import ResultsStore
+    from src.registry import ArtifactRegistry
+    from src.serving import ModelPool
+
+    # A throwaway backend tree: results store, plots dir and registry
+    base = os.path.join(bench.workdir, 'api')
+    rng = np.random.default_rng(bench.args.seed)
+    store = ResultsStore(os.path.join(base, 'results', 'store'))
+    for name in bench.datasets:
+        y_true = rng.normal(0, 1, bench.args.api_rows)
+        for model_name in ('LSTM', 'Transformer', 'Probabilistic'):
+            store.write('20000101T000000', name, model_name, y_true, y_true + rng.normal(0, 0.1, len(y_true)),
+                        rmse=0.1, mae=0.08, shapiro_p=0.5, target='radial')
+    store.commit()
+
+    *_, f_scaler, t_scaler = bench.scaled('SYN0')
+    seq_length, n_future = preprocessing.window_lengths('SYN0')
+    ArtifactRegistry(os.path.join(base, 'models', 'registry')).save(
+        'LSTM', 'SYN0', bench.model('LSTM'), f_scaler, t_scaler,
+        feature_cols=preprocessing.FEATURE_COLS, target_col=preprocessing.TARGET_COL,
+        seq_length=seq_length, n_future=n_future, target='radial', freq='15 min')
+
+    server.results_store = store
+    server.PLOTS_DIR = os.path.join(base, 'plots')
+    os.makedirs(server.PLOTS_DIR, exist_ok=True)
+    server.plot_cache = PlotCache(os.path.join(server.PLOTS_DIR, '.cache'))
+    server._forecast_pool = ModelPool(base)
+    server.response_cache.clear()
+    client = server.app.test_client()
+
+    def get(url, cold=False):
+        def call():
+            if cold:
+                server.response_cache.clear()
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url}: HTTP {response.status_code}")
+            return response.data
+        return call
+
+    history = bench.frame('SYN0')[preprocessing.TARGET_COL].to_numpy()[-(seq_length + 10):].tolist()
+
+    def forecast():
+        response = client.post('/api/forecast/lstm/SYN0', json={'history': history})
+        if response.status_code != 200:
+            raise RuntimeError(f"forecast: HTTP {response.status_code}")
+        return response.data
+
+    def thumb_cold():
+        server.plot_cache.clear()
+        return get('/api/plots/residuals_lstm_SYN0.png?size=thumb')()
+
+    name = 'SYN0'
+    bench.measure('api', 'metrics', get('/api/metrics'))
+    bench.measure('api', 'metrics_cold', get('/api/metrics', cold=True))
+    bench.measure('api', 'predictions', get(f'/api/predictions/{name}?points=500'), rows=bench.args.api_rows)
+    bench.measure('api', 'predictions_cold', get(f'/api/predictions/{name}?points=500', cold=True),
+                  rows=bench.args.api_rows)
+    bench.measure('api', 'available_plots', get('/api/available-plots'))
+    bench.measure('api', 'plot_thumb_cold', thumb_cold, repeat=max(1, bench.args.repeat // 2),
+                  trace_memory=False)
+    bench.measure('api', 'plot_thumb', get('/api/plots/residuals_lstm_SYN0.png?size=thumb'))
+    bench.measure('api', 'forecast_b1', forecast, trace_memory=False)
+
+
+STAGE_FUNCS = {
+    'ingest': stage_ingest,
+    'features': stage_features,
+    'windowing': stage_windowing,
+    'fit': stage_fit,
+    'predict': stage_predict,
+    'mc_dropout': stage_mc_dropout,
+    'api': stage_api,
+}
+
+
+def default_out(commit, dirty):
+    tag = (commit or 'nogit') + ('-dirty' if dirty else '')
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+    return os.path.join(BACKEND_DIR, 'benchmarks', 'results', f"{tag}_{stamp}.json")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark preprocessing, training and inference")
+    parser.add_argument('--stages', default=','.join(STAGES), help="comma separated subset of " + ', '.join(STAGES))
+    parser.add_argument('--satellites', type=int, default=3, help="synthetic satellites (SYN0..)")
+    parser.add_argument('--days', type=float, default=7, help="days of synthetic data per satellite")
+    parser.add_argument('--sample-minutes', type=int, default=120, help="raw synthetic sample spacing")
+    parser.add_argument('--no-bundled', action='store_true', help="skip data/*.csv")
+    parser.add_argument('--models', default='LSTM,Transformer,Probabilistic')
+    parser.add_argument('--epochs', type=int, default=3, help="fit epochs (the first one is reported apart)")
+    parser.add_argument('--batch', type=int, default=64, help="N for the batch-N predict / MC dropout")
+    parser.add_argument('--mc-iter', type=int, default=50)
+    parser.add_argument('--api-rows', type=int, default=20000, help="rows per stored prediction array")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--threads', type=int, default=None, help="TensorFlow / BLAS threads")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--quick', action='store_true', help="smoke run: 3 days, LSTM only, 2 epochs, 3 repeats")
+    parser.add_argument('--out', default=None, help="results JSON (default benchmarks/results/<commit>_<time>.json)")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.days, args.epochs, args.repeat, args.models = 3, 2, 3, 'LSTM'
+    args.models = [m for m in args.models.split(',') if m]
+    stages = [s for s in args.stages.split(',') if s]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    if args.threads:
+        from orchestrator import _init_worker
+        _init_worker(args.threads)
+
+    commit, dirty = git_state(BACKEND_DIR)
+    workdir = tempfile.mkdtemp(prefix='bench-')
+    start = time.perf_counter()
+    try:
+        bench = Bench(args, workdir)
+        print(f"Benchmarking {', '.join(stages)} on {', '.join(bench.datasets)}")
+        for stage in stages:
+            STAGE_FUNCS[stage](bench)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    config = {k: v for k, v in vars(args).items() if k != 'out'}
+    report = {
+        'commit': commit,
+        'dirty': dirty,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'elapsed_s': round(time.perf_counter() - start, 1),
+        'config': config,
+        'environment': environment(),
+        'results': bench.records,
+    }
+
+    out = args.out or default_out(commit, dirty)
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=1)
+    print(f"\n{len(bench.records)} results in {report['elapsed_s']}s -> {out}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
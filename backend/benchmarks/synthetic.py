@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.preprocessing import TIME_COL, TIME_FORMAT, VALUE_COLS
+
+# Orbit periods (hours) the synthetic satellites cycle through: GEO, MEO
+PERIODS = (23.93, 12.87)
+
+
+def synthetic_errors(days=7, sample_minutes=120, jitter_minutes=0, period_hours=23.93, seed=0,
+                     start='2025-09-01 06:00'):
+    """
+    Raw error series in the same shape as data/*.csv: utc_time plus x/y/z and
+    clock errors in meters.
+
+    Orbit errors are a once-per-revolution sine with a slow random walk and
+    noise; the clock error is a drifting random walk. Sample times can be
+    jittered so resampling has uneven bins to deal with, like the real files.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(days * 24 * 60 / sample_minutes)
+
+    minutes = np.arange(n) * sample_minutes
+    if jitter_minutes:
+        minutes = minutes + rng.integers(-jitter_minutes, jitter_minutes + 1, n)
+    minutes = np.sort(minutes)
+    t_hours = minutes / 60.0
+
+    phase = rng.uniform(0, 2 * np.pi, 3)
+    amp = rng.uniform(0.5, 3.0, 3)
+    walk = np.cumsum(rng.normal(0, 0.05, (n, 3)), axis=0)
+    xyz = (amp * np.sin(2 * np.pi * t_hours[:, None] / period_hours + phase)
+           + walk + rng.normal(0, 0.2, (n, 3)))
+    clock = np.cumsum(rng.normal(0.001, 0.05, n)) + rng.normal(0, 0.1, n)
+
+    times = pd.Timestamp(start) + pd.to_timedelta(minutes, unit='min')
+    df = pd.DataFrame(np.column_stack([xyz, clock]), columns=VALUE_COLS)
+    df.insert(0, TIME_COL, times)
+    return df
+
+
+def write_constellation(out_dir, satellites=3, days=7, sample_minutes=120, jitter_minutes=10, seed=0):
+    """Write one raw CSV per synthetic satellite; returns {name: path}"""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {}
+    for i in range(satellites):
+        df = synthetic_errors(days, sample_minutes, jitter_minutes,
+                              period_hours=PERIODS[i % len(PERIODS)], seed=seed + i)
+        df[TIME_COL] = df[TIME_COL].dt.strftime(TIME_FORMAT)
+        name = f"SYN{i}"
+        paths[name] = os.path.join(out_dir, f"DATA_{name}.csv")
+        df.to_csv(paths[name], index=False)
+    return paths
@@ -0,0 +1,72 @@
+import numpy as np
+
+
+def lttb_indices(columns, n_out):
+    """
+    Largest-Triangle-Three-Buckets point selection over one or more series.
+
+    columns: (n, k) array (or 1-D) sharing the row index as x axis. Returns the
+    sorted row indices to keep, always including the first and last row.
+
+    Fully vectorized: each bucket is scored against the mean of the previous
+    and next buckets rather than the previously selected point, so all buckets
+    are solved in one pass. The triangle areas of the k series are summed so
+    one set of indices preserves the shape of all of them.
+    """
+    y = np.asarray(columns, dtype=np.float64)
+    if y.ndim == 1:
+        y = y[:, np.newaxis]
+    n = len(y)
+
+    if n_out >= n or n <= 2:
+        return np.arange(n)
+    if n_out <= 2:
+        return np.array([0, n - 1])
+
+    # n_out - 2 buckets over rows 1..n-2 (first and last row are always kept)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    sizes = ends - starts
+    width = sizes.max()
+
+    idx = starts[:, None] + np.arange(width)
+    valid = idx < ends[:, None]
+    idx = np.where(valid, idx, starts[:, None])
+
+    x = np.arange(n, dtype=np.float64)
+
+    # Bucket means (x and y) for the neighbouring anchors
+    y_buckets = y[idx]                                   # (buckets, width, k)
+    y_mean = (y_buckets * valid[..., None]).sum(axis=1) / sizes[:, None]
+    x_mean = (starts + ends - 1) / 2.0
+
+    # Previous anchor: first row, then previous bucket means; next: following bucket means, then last row
+    ax = np.concatenate([[0.0], x_mean[:-1]])
+    ay = np.concatenate([y[:1], y_mean[:-1]])
+    cx = np.concatenate([x_mean[1:], [n - 1.0]])
+    cy = np.concatenate([y_mean[1:], y[-1:]])
+
+    px = x[idx]
+    area = np.abs(
+        (ax - cx)[:, None, None] * (y_buckets - ay[:, None, :])
+        - (ax[:, None] - px)[..., None] * (cy - ay)[:, None, :]
+    ).sum(axis=-1)
+    area[~valid] = -1.0
+
+    picked = idx[np.arange(len(idx)), area.argmax(axis=1)]
+    return np.concatenate([[0], picked, [n - 1]])
+
+
+def downsample_range(columns, start=0, end=None, points=500):
+    """
+    Row indices of `columns` within [start, end), downsampled to about `points`.
+
+    Returns absolute row indices into the original array.
+    """
+    n = len(columns)
+    start = max(0, min(int(start), n))
+    end = n if end is None else max(start, min(int(end), n))
+
+    if points is None or end - start <= points:
+        return np.arange(start, end)
+    return start + lttb_indices(columns[start:end], points)
@@ -2,13 +2,11 @@ import numpy as np
 import pandas as pd
 import tensorflow as tf
 from tensorflow.keras import layers, Model 
-import matplotlib.pyplot as plt
-import seaborn as sns
 from sklearn.metrics import mean_squared_error, mean_absolute_error
+from sklearn.preprocessing import MinMaxScaler
 import os
 import warnings
 warnings.filterwarnings('ignore')
-from scipy import stats
 import os
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '0' # to ignore warning abou oneDSS that is comming on console
 
@@ -16,23 +14,38 @@ os.environ['TF_CPP_MIN_LOG_LEVEL'] = '0' # to ignore warning abou oneDSS that is
 from src.Lstm import LSTMModel
 from src.Transformer import TransformerModel
 from src.Probablistic import ProbabilisticModel
+from src.Constellation import ConstellationModel, stack_windows
+from src.Clock import (ClockErrorModel, CLOCK_FEATURE_COLS, CLOCK_TARGET, CLOCK_FREQ,
+                       CLOCK_LOOKBACK, CLOCK_HORIZON, add_clock_features, clip_bounds)
 from src import preprocessing
+from src.registry import ArtifactRegistry
+from src.residuals import ResidualStats
+from src.finetune import finetune, sample_replay, update_replay
+from src import instrument
+from src.instrument import span, traced
+from results_store import ResultsStore
 
-def analyze_residual_normality(y_true, y_pred, model_name, dataset_name):
-    # Calculate residuals
-    residuals = (y_true - y_pred).flatten()
-    
-    # Remove any NaN/Inf
-    residuals = residuals[np.isfinite(residuals)]
+def analyze_residual_normality(y_true, y_pred, model_name, dataset_name, n_steps=1):
+    """
+    Residual moments (overall and per horizon step) plus a Shapiro-Wilk test.
+
+    Moments come from one streaming pass (src.residuals.ResidualStats); the
+    normality test uses its stratified sample, so every horizon step is
+    represented instead of just the first 5000 residuals. The residual plots
+    are drawn later from the results store (plots.py).
+    Returns (shapiro_p, ResidualStats).
+    """
+    residuals = (np.asarray(y_true) - np.asarray(y_pred)).reshape(-1, n_steps)
+    res_stats = ResidualStats.from_residuals(residuals, n_steps, seed=0)
+    overall = res_stats.pooled()
     
     # Statistical tests for normality
-    shapiro_stat, shapiro_p = stats.shapiro(residuals[:5000])  # Shapiro-Wilk test
+    shapiro_stat, shapiro_p = res_stats.shapiro()  # Shapiro-Wilk test
     
-    # Additional statistics
-    mean_res = np.mean(residuals)
-    std_res = np.std(residuals)
-    skewness = stats.skew(residuals)
-    kurtosis = stats.kurtosis(residuals)
+    mean_res = overall.mean[0]
+    std_res = overall.std[0]
+    skewness = overall.skew[0]
+    kurtosis = overall.kurtosis[0]
     
     # Print results
     print(f"\n{'='*60}")
@@ -43,81 +56,117 @@ def analyze_residual_normality(y_true, y_pred, model_name, dataset_name):
     print(f"Skewness:          {skewness:.4f} (ideal: ~0)")
     print(f"Kurtosis:          {kurtosis:.4f} (ideal: ~0)")
     print(f"Shapiro-Wilk p:    {shapiro_p:.6f}")
+    if n_steps > 1:
+        print(f"Std by step:       {res_stats.std[0]:.4f} (first) -> {res_stats.std[-1]:.4f} (last)")
     
     if shapiro_p > 0.05:
         print(f"✓ NORMAL distribution (p > 0.05)")
     else:
         print(f"✗ NOT normal (p < 0.05)")
     
-    # Create plots
-    fig, axes = plt.subplots(1, 3, figsize=(15, 4))
-    fig.suptitle(f'Residual Analysis - {model_name} ({dataset_name})', fontsize=14, fontweight='bold')
-    
-    # 1. Histogram with normal curve overlay
-    ax = axes[0]
-    ax.hist(residuals, bins=50, density=True, alpha=0.7, color='blue', edgecolor='black')
-    
-    # Overlay normal distribution curve
-    mu, sigma = mean_res, std_res
-    x = np.linspace(residuals.min(), residuals.max(), 100)
-    ax.plot(x, stats.norm.pdf(x, mu, sigma), 'r-', linewidth=2, label='Normal curve')
-    
-    ax.set_title(f'Histogram\nShapiro p={shapiro_p:.4f}')
-    ax.set_xlabel('Residual (m)')
-    ax.set_ylabel('Density')
-    ax.legend()
-    ax.grid(True, alpha=0.3)
-    
-    # 2. Q-Q Plot (most important!)
-    ax = axes[1]
-    stats.probplot(residuals, dist="norm", plot=ax)
-    ax.set_title('Q-Q Plot\n')
-    ax.grid(True, alpha=0.3)
-    
-    # 3. Residuals vs Predicted (check for patterns)
-    ax = axes[2]
-    ax.scatter(y_pred.flatten(), residuals, alpha=0.3, s=10)
-    ax.axhline(y=0, color='r', linestyle='--', linewidth=2)
-    ax.set_title('Residuals vs Predicted\n')
-    ax.set_xlabel('Predicted Value (m)')
-    ax.set_ylabel('Residual (m)')
-    ax.grid(True, alpha=0.3)
-    
-    plt.tight_layout()
-    plt.savefig(f'plots/residuals_{model_name.lower()}_{dataset_name}.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    
-    print(f"✓ Plot saved to plots/residuals_{model_name.lower()}_{dataset_name}.png")
-    
-    return shapiro_p
+    return shapiro_p, res_stats
 
 
-def train_all_models(data_path, dataset_name):
-    """Train all 3 models on a dataset"""
-    
-    print(f"PROCESSING: {dataset_name}")
+def loss_history(history):
+    """Keras History -> plain float lists, stored with the results for the plot stage"""
+    return {key: [float(v) for v in values] for key, values in history.history.items()}
+
+
+# Models trained on every dataset
+MODELS = {
+    'LSTM': LSTMModel,
+    'Transformer': TransformerModel,
+    'Probabilistic': ProbabilisticModel,
+    'Clock': ClockErrorModel,
+}
+
+# What each model forecasts; models with the same target share one prepared dataset
+TARGETS = {
+    'LSTM': 'radial',
+    'Transformer': 'radial',
+    'Probabilistic': 'radial',
+    'Clock': 'clock',
+}
+
+# Versioned model + scaler + window config artifacts, used for serving
+REGISTRY = ArtifactRegistry("models/registry")
+
+# Typed, memory-mappable predictions + metrics per training run, read by the API
+RESULTS = ResultsStore("results/store")
+
+DATASETS = [
+    ("./data/DATA_GEO_Train.csv", "GEO"),
+    ("./data/DATA_MEO_Train.csv", "MEO1"),
+    ("./data/DATA_MEO_Train2.csv", "MEO2"),
+]
+
+
+@traced(size=False)
+def prepare_dataset(data_path, dataset_name, target='radial', scalers=None, clip=None):
+    """
+    Load, featurize, split, scale and window one dataset for a target ('radial' or 'clock').
+    `scalers` / `clip` reuse an existing artifact's preprocessing instead of fitting it.
+    """
+    if target == 'clock':
+        return prepare_clock_dataset(data_path, dataset_name, scalers=scalers, clip=clip)
     
     # Load and preprocess
     df = preprocessing.load_and_preprocess(data_path)
     df = preprocessing.add_features(df)
     df_train, df_test = preprocessing.split_train_test(df)
 
-    X_train_scaled, X_test_scaled, y_train_scaled, y_test_scaled, f_scaler, t_scaler = \
-        preprocessing.scale_data(
-            df_train, df_test,
-            feature_cols=['radial_lag1', 'radial_diff1', 'radial_roll3', 'radial_roll6'],
-            target_col='radial_error_m'
-        )
+    scaled = preprocessing.scale_data(
+        df_train, df_test,
+        feature_cols=preprocessing.FEATURE_COLS,
+        target_col=preprocessing.TARGET_COL,
+        fitted=scalers
+    )
 
-    if dataset_name == "MEO2":
-        seq_length_hr = 8   
-        n_future_hr = 4     
-    else:
-        seq_length_hr = 12
-        n_future_hr = 12
+    # 12h in / 12h out, except MEO2 which uses 8h / 4h
+    seq_length, n_future = preprocessing.window_lengths(dataset_name)
+
+    data = _window_splits(scaled, seq_length, n_future)
+    data['train_index'] = df_train.index
+    data.update({
+        'target': 'radial',
+        'feature_cols': preprocessing.FEATURE_COLS,
+        'target_col': preprocessing.TARGET_COL,
+        'freq': '15 min',
+        'batch_size': 8,
+    })
+    return data
+
+
+def prepare_clock_dataset(data_path, dataset_name, scalers=None, clip=None):
+    """Hourly clock-error series: clipped orbit / clock features, MinMax scaled, 6h in / 1h out"""
+    df = preprocessing.load_and_preprocess(data_path, freq=CLOCK_FREQ)
+    bounds = clip or clip_bounds(df)
+    df = add_clock_features(df, bounds)
+    df_train, df_test = preprocessing.split_train_test_percentage(df, train_ratio=0.8)
+
+    scaled = preprocessing.scale_data(
+        df_train, df_test,
+        feature_cols=CLOCK_FEATURE_COLS,
+        target_col=CLOCK_TARGET,
+        scaler=MinMaxScaler,
+        fitted=scalers
+    )
+
+    data = _window_splits(scaled, CLOCK_LOOKBACK, CLOCK_HORIZON)
+    data['train_index'] = df_train.index
+    data.update({
+        'target': 'clock',
+        'feature_cols': CLOCK_FEATURE_COLS,
+        'target_col': CLOCK_TARGET,
+        'freq': CLOCK_FREQ,
+        'batch_size': 16,
+        'clip': bounds,
+    })
+    return data
 
-    seq_length = int((seq_length_hr * 60) / 15)
-    n_future = int((n_future_hr * 60) / 15)
+
+def _window_splits(scaled, seq_length, n_future):
+    X_train_scaled, X_test_scaled, y_train_scaled, y_test_scaled, f_scaler, t_scaler = scaled
 
     X_train_seq, y_train_seq = preprocessing.create_sequences(
         X_train_scaled, y_train_scaled, seq_length, n_future
@@ -130,173 +179,324 @@ def train_all_models(data_path, dataset_name):
     
     if X_train_seq.shape[0] < 10:
         print(f"Only {X_train_seq.shape[0]} training sequences. Results may be poor.")
-    
-    results = {}
-    
-    # Train all 3 models
-    models = {
-        'LSTM': LSTMModel,
-        'Transformer': TransformerModel,
-        'Probabilistic': ProbabilisticModel
+
+    return {
+        'X_train_scaled': X_train_scaled,
+        'y_train_scaled': y_train_scaled,
+        'X_test_scaled': X_test_scaled,
+        'y_test_scaled': y_test_scaled,
+        'X_train_seq': X_train_seq,
+        'y_train_seq': y_train_seq,
+        'X_test_seq': X_test_seq,
+        'y_test_seq': y_test_seq,
+        'feature_scaler': f_scaler,
+        'target_scaler': t_scaler,
+        'seq_length': seq_length,
+        'n_future': n_future,
     }
+
+
+def train_model(model_name, data, dataset_name, stream=False, run_id=None):
+    """Train, evaluate and save one model on a prepared dataset"""
+    run_id = run_id or RESULTS.new_run_id()
+    print(f"\n  Training {model_name} on {dataset_name}...", end=" ")
+    
+    X_train_seq, y_train_seq = data['X_train_seq'], data['y_train_seq']
+    X_test_seq, y_test_seq = data['X_test_seq'], data['y_test_seq']
+    t_scaler = data['target_scaler']
+    batch_size = data.get('batch_size', 8)
+    
+    model = MODELS[model_name](
+        input_shape=(X_train_seq.shape[1], X_train_seq.shape[2]),
+        output_steps=y_train_seq.shape[1]
+    )
     
-    for model_name, ModelClass in models.items():
-        print(f"\n  Training {model_name}...", end=" ")
-        
-        model = ModelClass(
-            input_shape=(X_train_seq.shape[1], X_train_seq.shape[2]),
-            output_steps=y_train_seq.shape[1]
-        )
-        
-        history = model.train(X_train_seq, y_train_seq, epochs=100, batch_size=8)
-        
-        # Predict
+    with span('train', model=model_name, dataset=dataset_name, stream=stream) as s:
+        s.set(X=X_train_seq, y=y_train_seq)
+        if stream:
+            # Windows are generated on the fly from the scaled series
+            history = model.train_stream(data['X_train_scaled'], data['y_train_scaled'],
+                                         data['seq_length'], data['n_future'],
+                                         epochs=100, batch_size=batch_size)
+        else:
+            history = model.train(X_train_seq, y_train_seq, epochs=100, batch_size=batch_size)
+        s.set(epochs=len(history.history['loss']))
+    
+    replay = sample_replay(X_train_seq, y_train_seq)
+    return evaluate_and_register(model, history, model_name, data, dataset_name, run_id, replay)
+
+
+def evaluate_and_register(model, history, model_name, data, dataset_name, run_id, replay=None, **extra):
+    """Score a trained model on the test windows, save / register it and store its predictions"""
+    X_train_seq, y_train_seq = data['X_train_seq'], data['y_train_seq']
+    X_test_seq, y_test_seq = data['X_test_seq'], data['y_test_seq']
+    t_scaler = data['target_scaler']
+    
+    # Predict
+    with span('predict', model=model_name, dataset=dataset_name) as s:
         y_pred_scaled = model.predict(X_test_seq)
+        s.set(X=X_test_seq)
 
-        # Check shapes before reshaping
-        print(f"    Pred shape: {y_pred_scaled.shape}, True shape: {y_test_seq.shape}")
+    # Check shapes before reshaping
+    print(f"    Pred shape: {y_pred_scaled.shape}, True shape: {y_test_seq.shape}")
 
-        # Ensure both have same shape
-        min_samples = min(y_pred_scaled.shape[0], y_test_seq.shape[0])
-        y_pred_scaled = y_pred_scaled[:min_samples]
-        y_test_seq_trimmed = y_test_seq[:min_samples]
+    # Ensure both have same shape
+    min_samples = min(y_pred_scaled.shape[0], y_test_seq.shape[0])
+    y_pred_scaled = y_pred_scaled[:min_samples]
+    y_test_seq_trimmed = y_test_seq[:min_samples]
 
-        # Flatten and inverse transform
-        y_pred_flat = y_pred_scaled.reshape(-1, 1)
-        y_test_flat = y_test_seq_trimmed.reshape(-1, 1)
+    # Per-horizon-step stats only make sense when every window covers the same steps
+    n_steps = y_test_seq.shape[1] if y_pred_scaled.shape[1:] == y_test_seq.shape[1:] else 1
 
-        # Make sure they match
-        if y_pred_flat.shape[0] != y_test_flat.shape[0]:
-            min_len = min(y_pred_flat.shape[0], y_test_flat.shape[0])
-            y_pred_flat = y_pred_flat[:min_len]
-            y_test_flat = y_test_flat[:min_len]
+    # Flatten and inverse transform
+    y_pred_flat = y_pred_scaled.reshape(-1, 1)
+    y_test_flat = y_test_seq_trimmed.reshape(-1, 1)
 
-        y_pred = t_scaler.inverse_transform(y_pred_flat)
-        y_true = t_scaler.inverse_transform(y_test_flat)
-        
-        # Calculate metrics
-        rmse = np.sqrt(mean_squared_error(y_true, y_pred))
-        mae = mean_absolute_error(y_true, y_pred)
-          
-        shapiro_p = analyze_residual_normality(y_true, y_pred, model_name, dataset_name)
-        
-        results[model_name] = {
-            'model': model,
-            'history': history,
-            'y_true': y_true,
-            'y_pred': y_pred,
-            'rmse': rmse,
-            'mae': mae,
-            'shapiro_p': shapiro_p 
-        }
-        
-        print(f"RMSE: {rmse:.4f}m, MAE: {mae:.4f}m, Normality p: {shapiro_p:.4f}")
-        
+    # Make sure they match
+    if y_pred_flat.shape[0] != y_test_flat.shape[0]:
+        min_len = min(y_pred_flat.shape[0], y_test_flat.shape[0])
+        y_pred_flat = y_pred_flat[:min_len]
+        y_test_flat = y_test_flat[:min_len]
+
+    y_pred = t_scaler.inverse_transform(y_pred_flat)
+    y_true = t_scaler.inverse_transform(y_test_flat)
+    
+    # Calculate metrics
+    rmse = np.sqrt(mean_squared_error(y_true, y_pred))
+    mae = mean_absolute_error(y_true, y_pred)
+      
+    with span('residuals', model=model_name, dataset=dataset_name):
+        shapiro_p, res_stats = analyze_residual_normality(y_true, y_pred, model_name, dataset_name, n_steps=n_steps)
+    
+    print(f"RMSE: {rmse:.4f}m, MAE: {mae:.4f}m, Normality p: {shapiro_p:.4f}")
+    
+    with span('register', model=model_name, dataset=dataset_name):
         # Save model
         model.model.save(f"models/{model_name.lower()}_{dataset_name}.h5")
         
-        # Save predictions
-        pred_df = pd.DataFrame({
-            'y_true': y_true.flatten(),
-            'y_pred': y_pred.flatten(),
-            'error': (y_true - y_pred).flatten()
-        })
-        pred_df.to_csv(f"results/predictions_{model_name.lower()}_{dataset_name}.csv", index=False)
-
-    
-    # Plot comparison
-    plot_comparison(results, dataset_name)
+        # Register model with its scalers and window config so it can be served as-is
+        if 'clip' in data:
+            extra['clip'] = data['clip']
+        version = REGISTRY.save(
+            model_name, dataset_name, model,
+            data['feature_scaler'], t_scaler,
+            feature_cols=data['feature_cols'],
+            target_col=data['target_col'],
+            seq_length=X_train_seq.shape[1],
+            n_future=y_train_seq.shape[1],
+            target=data['target'],
+            freq=data['freq'],
+            data_end=data['train_index'][-1].isoformat(),
+            rmse=float(rmse), mae=float(mae),
+            replay=replay,
+            **extra
+        )
+    print(f"    Registered {model_name.lower()}_{dataset_name} v{version}")
     
-    return results
+    # Save predictions
+    RESULTS.write(run_id, dataset_name, model_name, y_true, y_pred,
+                  rmse=rmse, mae=mae, shapiro_p=shapiro_p, model_version=version,
+                  target=data['target'], residuals=res_stats.to_dict(),
+                  history=loss_history(history))
 
-def plot_comparison(results, dataset_name):
-    """Create comparison plots"""
-    
-    fig, axes = plt.subplots(2, 2, figsize=(15, 10))
-    fig.suptitle(f'Model Comparison - {dataset_name}', fontsize=16)
-    
-    # 1. Predictions comparison
-    ax = axes[0, 0]
-    for model_name, res in results.items():
-        y_true = res['y_true'][:100]  # First 100 points
-        y_pred = res['y_pred'][:100]
-        ax.plot(y_pred, label=f'{model_name} (pred)', alpha=0.7)
-    ax.plot(y_true, 'k--', label='True', linewidth=2)
-    ax.set_title('Predictions Comparison')
-    ax.set_xlabel('Time Step')
-    ax.set_ylabel('Radial Error (m)')
-    ax.legend()
-    ax.grid(True)
-    
-    # 2. Error distributions
-    ax = axes[0, 1]
-    for model_name, res in results.items():
-        errors = res['y_true'] - res['y_pred']
-        ax.hist(errors, bins=30, alpha=0.5, label=model_name)
-    ax.set_title('Error Distributions')
-    ax.set_xlabel('Error (m)')
-    ax.set_ylabel('Count')
-    ax.legend()
-    ax.grid(True)
-    
-    # 3. Training history
-    ax = axes[1, 0]
-    for model_name, res in results.items():
-        history = res['history'].history
-        ax.plot(history['val_loss'], label=f'{model_name}')
-    ax.set_title('Validation Loss')
-    ax.set_xlabel('Epoch')
-    ax.set_ylabel('Loss')
-    ax.legend()
-    ax.grid(True)
-    ax.set_yscale('log')
-    
-    # 4. Metrics comparison
-    ax = axes[1, 1]
-    model_names = list(results.keys())
-    rmses = [results[m]['rmse'] for m in model_names]
-    maes = [results[m]['mae'] for m in model_names]
-    
-    x = np.arange(len(model_names))
-    width = 0.35
-    ax.bar(x - width/2, rmses, width, label='RMSE', alpha=0.8)
-    ax.bar(x + width/2, maes, width, label='MAE', alpha=0.8)
-    ax.set_title('Metrics Comparison')
-    ax.set_ylabel('Error (m)')
-    ax.set_xticks(x)
-    ax.set_xticklabels(model_names)
-    ax.legend()
-    ax.grid(True, axis='y')
-    
-    plt.tight_layout()
-    plt.savefig(f'plots/comparison_{dataset_name}.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    
-    print(f"  ✓ Plots saved to plots/comparison_{dataset_name}.png")
+    return {
+        'model': model,
+        'target': data['target'],
+        'history': history.history,
+        'y_true': y_true,
+        'y_pred': y_pred,
+        'rmse': rmse,
+        'mae': mae,
+        'shapiro_p': shapiro_p,
+        'residuals': res_stats,
+        'version': version
+    }
 
-if __name__ == "__main__":
-    print("SATELLITE ERROR PREDICTION - QUICK TRAINING")
+
+def finetune_model(model_name, data_path, dataset_name, epochs=15, run_id=None):
+    """
+    Refresh the latest registered version of a model on data it hasn't seen.
+
+    The artifact's weights and scalers are reused; only windows whose targets
+    reach past the version's `data_end` are new, and they are mixed with the
+    artifact's replay buffer. Saved as a new version. Falls back to a full
+    train_model when nothing is registered yet.
+    """
+    run_id = run_id or RESULTS.new_run_id()
+    target = TARGETS[model_name]
+    
+    try:
+        meta = REGISTRY.meta(model_name, dataset_name)
+    except KeyError:
+        print(f"  No {model_name.lower()}_{dataset_name} artifact yet, training from scratch")
+        return train_model(model_name, prepare_dataset(data_path, dataset_name, target), dataset_name, run_id=run_id)
+    
+    artifact = REGISTRY.load(model_name, dataset_name, meta['version'])
+    data = prepare_dataset(data_path, dataset_name, target,
+                           scalers=(artifact.feature_scaler, artifact.target_scaler),
+                           clip=meta.get('clip'))
+    X_train_seq, y_train_seq = data['X_train_seq'], data['y_train_seq']
+    seq_length, n_future = X_train_seq.shape[1], y_train_seq.shape[1]
+    if (seq_length, n_future) != (meta['seq_length'], meta['n_future']):
+        raise ValueError(f"{model_name} on {dataset_name}: window changed since v{meta['version']}")
+    
+    # First row the previous version never trained on (older artifacts: the last training day)
+    index = data['train_index']
+    if 'data_end' in meta:
+        new_from = index.searchsorted(pd.Timestamp(meta['data_end']), side='right')
+    else:
+        days = index.normalize()
+        new_from = days.searchsorted(days[-1])
+    first = max(0, new_from - seq_length - n_future + 1)
+    
+    X_new, y_new = X_train_seq[first:], y_train_seq[first:]
+    if len(X_new) == 0 or new_from >= len(index):
+        print(f"  {model_name} on {dataset_name}: no new data since v{meta['version']}")
+        return None
+    
+    replay = REGISTRY.replay(model_name, dataset_name, meta['version'])
+    if replay is None:
+        replay = sample_replay(X_train_seq[:first], y_train_seq[:first])
+    
+    print(f"\n  Fine-tuning {model_name} on {dataset_name} v{meta['version']}: "
+          f"{len(X_new)} new + {len(replay[0])} replay windows...", end=" ")
+    model = MODELS[model_name](input_shape=(seq_length, X_train_seq.shape[2]), output_steps=n_future)
+    model.model.set_weights(artifact.model.get_weights())
+    with span('finetune', model=model_name, dataset=dataset_name) as s:
+        s.set(X_new=X_new, X_replay=replay[0])
+        history = finetune(model, X_new, y_new, replay, epochs=epochs, batch_size=data.get('batch_size', 8))
+    
+    return evaluate_and_register(model, history, model_name, data, dataset_name, run_id,
+                                 replay=update_replay(replay, X_new, y_new),
+                                 parent_version=meta['version'])
+
+
+def train_all_models(data_path, dataset_name, stream=False, run_id=None):
+    """Train every model on a dataset (stream=True feeds fit from a tf.data pipeline)
+
+    Figures are not drawn here; run the plot stage (plots.render_plots) afterwards.
+    """
     
-    datasets = [
-        ("./data/DATA_GEO_Train.csv", "GEO"),
-        ("./data/DATA_MEO_Train.csv", "MEO1"),
-        ("./data/DATA_MEO_Train2.csv", "MEO2"),
-    ]
+    print(f"PROCESSING: {dataset_name}")
+    run_id = run_id or RESULTS.new_run_id()
+    
+    # One prepared dataset per target
+    data = {}
+    results = {}
     
-    all_results = {}
+    for model_name in MODELS:
+        target = TARGETS[model_name]
+        if target not in data:
+            data[target] = prepare_dataset(data_path, dataset_name, target)
+        results[model_name] = train_model(model_name, data[target], dataset_name, stream=stream, run_id=run_id)
+    RESULTS.commit()
     
+    return results
+
+
+def train_constellation(datasets=DATASETS, run_id=None, epochs=100, seq_length=None, n_future=None):
+    """
+    Train one shared-weights model on every dataset's radial error series.
+
+    Each series keeps its own scalers; the windows are stacked into a single
+    training set tagged with a satellite id. All test windows are predicted in
+    one forward pass. Registered as constellation_ALL.
+    """
+    run_id = run_id or RESULTS.new_run_id()
+
+    # One window shape for every satellite; default to the shortest (8h / 4h)
+    # so even the shortest test day has full windows
+    if seq_length is None or n_future is None:
+        seq_length, n_future = preprocessing.window_lengths('MEO2')
+
+    train, test, scalers = {}, {}, {}
     for data_path, dataset_name in datasets:
-        if os.path.exists(data_path):
-            try:
-                results = train_all_models(data_path, dataset_name)
-                all_results[dataset_name] = results
-            except Exception as e:
-                print(f"Error processing {dataset_name}: {e}")
-        else:
+        if not os.path.exists(data_path):
             print(f"File not found: {data_path}")
+            continue
+        data = prepare_dataset(data_path, dataset_name)
+        train[dataset_name] = (data['X_train_scaled'], data['y_train_scaled'])
+        # Test windows start in the last seq_length train samples, so every
+        # test sample can be a forecast target
+        test[dataset_name] = (
+            np.concatenate([data['X_train_scaled'][-seq_length:], data['X_test_scaled']]),
+            np.concatenate([data['y_train_scaled'][-seq_length:], data['y_test_scaled']]),
+        )
+        scalers[dataset_name] = (data['feature_scaler'], data['target_scaler'])
+
+    X, sat_ids, y = stack_windows(train, seq_length, n_future)
+    print(f"\n  Training Constellation on {len(train)} series ({len(X)} windows)...", end=" ")
+
+    model = ConstellationModel((seq_length, X.shape[2]), n_future, satellites=list(train))
+    with span('train', model='Constellation', dataset='ALL') as s:
+        s.set(X=X, y=y)
+        history = model.train(X, sat_ids, y, epochs=epochs)
+
+    # Test windows of every satellite in one batch
+    X_test, test_ids, y_test = stack_windows(test, seq_length, n_future)
+    with span('predict', model='Constellation', dataset='ALL') as s:
+        y_pred_scaled = model.predict(X_test, test_ids)
+        s.set(X=X_test)
+
+    version = REGISTRY.save(
+        'Constellation', 'ALL', model,
+        {name: f for name, (f, _) in scalers.items()},
+        {name: t for name, (_, t) in scalers.items()},
+        feature_cols=preprocessing.FEATURE_COLS,
+        target_col=preprocessing.TARGET_COL,
+        seq_length=seq_length,
+        n_future=n_future,
+        target='radial',
+        freq='15 min',
+        satellites=model.satellites,
+    )
+    print(f"\n    Registered constellation_ALL v{version}")
+
+    results = {}
+    constellation_stats = ResidualStats(n_future, seed=0)
+    for i, name in enumerate(model.satellites):
+        mask = test_ids == i
+        if not mask.any():
+            print(f"    No full test window for {name}")
+            continue
+        t_scaler = scalers[name][1]
+        y_true = t_scaler.inverse_transform(y_test[mask].reshape(-1, 1))
+        y_pred = t_scaler.inverse_transform(y_pred_scaled[mask].reshape(-1, 1))
+
+        rmse = np.sqrt(mean_squared_error(y_true, y_pred))
+        mae = mean_absolute_error(y_true, y_pred)
+        shapiro_p, res_stats = analyze_residual_normality(y_true, y_pred, 'Constellation', name,
+                                                          n_steps=n_future)
+        constellation_stats.merge(res_stats)
+        print(f"    {name}: RMSE: {rmse:.4f}m, MAE: {mae:.4f}m, Normality p: {shapiro_p:.4f}")
+
+        RESULTS.write(run_id, name, 'Constellation', y_true, y_pred,
+                      rmse=rmse, mae=mae, shapiro_p=shapiro_p, model_version=version,
+                      target='radial', residuals=res_stats.to_dict(),
+                      history=loss_history(history))
+        results[name] = {
+            'target': 'radial',
+            'history': history.history,
+            'y_true': y_true,
+            'y_pred': y_pred,
+            'rmse': rmse,
+            'mae': mae,
+            'shapiro_p': shapiro_p,
+            'residuals': res_stats,
+            'version': version
+        }
+    RESULTS.commit()
     
-    print("FINAL RESULTS SUMMARY")
-    
+    # Residuals of every satellite together; merged from the per-satellite stats
+    overall = constellation_stats.pooled()
+    print(f"    All satellites: residual std {overall.std[0]:.4f}m, "
+          f"Shapiro p {constellation_stats.shapiro()[1]:.4f}")
+
+    return model, results
+
+
+def write_summary(all_results, path='results/metrics_summary.csv'):
+    """Write the per dataset / model metrics table"""
     summary_data = []
     for dataset_name, results in all_results.items():
         for model_name, res in results.items():
@@ -312,13 +512,91 @@ if __name__ == "__main__":
     summary_df = pd.DataFrame(summary_data)
     print(summary_df.to_string(index=False))
     
-    summary_df.to_csv('results/metrics_summary.csv', index=False)
-    print("\nSummary saved to results/metrics_summary.csv")
+    summary_df.to_csv(path, index=False)
+    print(f"\nSummary saved to {path}")
+    return summary_df
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Train all models on all datasets")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="parallel (dataset x model) jobs; 1 trains sequentially in-process")
+    parser.add_argument('--threads', type=int, default=None,
+                        help="TensorFlow threads per worker (default: cpu_count / workers)")
+    parser.add_argument('--stream', action='store_true', help="train from a tf.data window pipeline")
+    parser.add_argument('--finetune', action='store_true',
+                        help="refresh the latest registered models on new data instead of retraining")
+    parser.add_argument('--constellation', action='store_true',
+                        help="also train one shared-weights model over all datasets")
+    parser.add_argument('--plots', choices=['full', 'preview', 'none'], default='full',
+                        help="plot stage after training: 300 dpi, low-res preview, or skip (no matplotlib)")
+    parser.add_argument('--plot-workers', type=int, default=None,
+                        help="processes rendering figures (default: cpu_count)")
+    parser.add_argument('--trace', default=None, metavar='PATH',
+                        help="record per-stage timing / memory spans as JSON lines (e.g. results/trace.jsonl)")
+    args = parser.parse_args()
+    
+    print("SATELLITE ERROR PREDICTION - QUICK TRAINING")
+    run_id = RESULTS.new_run_id()
+    if args.trace:
+        # Workers inherit this through the environment
+        instrument.enable(args.trace, run=run_id)
+    
+    if args.workers > 1:
+        from orchestrator import train_parallel
+        all_results = train_parallel(DATASETS, workers=args.workers, threads=args.threads,
+                                     stream=args.stream, run_id=run_id, finetune=args.finetune)
+    elif args.finetune:
+        all_results = {}
+        
+        for data_path, dataset_name in DATASETS:
+            if not os.path.exists(data_path):
+                print(f"File not found: {data_path}")
+                continue
+            for model_name in MODELS:
+                res = finetune_model(model_name, data_path, dataset_name, run_id=run_id)
+                if res is not None:
+                    all_results.setdefault(dataset_name, {})[model_name] = res
+        RESULTS.commit()
+    else:
+        all_results = {}
+        
+        for data_path, dataset_name in DATASETS:
+            if os.path.exists(data_path):
+                try:
+                    results = train_all_models(data_path, dataset_name, stream=args.stream, run_id=run_id)
+                    all_results[dataset_name] = results
+                except Exception as e:
+                    print(f"Error processing {dataset_name}: {e}")
+            else:
+                print(f"File not found: {data_path}")
+    
+    if args.constellation:
+        _, constellation = train_constellation(DATASETS, run_id=run_id)
+        for dataset_name, res in constellation.items():
+            all_results.setdefault(dataset_name, {})['Constellation'] = res
+    
+    print("FINAL RESULTS SUMMARY")
+    
+    write_summary(all_results)
+    
+    if args.plots != 'none':
+        from plots import render_plots
+        print("\nRENDERING PLOTS")
+        with span('plots', mode=args.plots):
+            render_plots(RESULTS, 'plots', mode=args.plots, workers=args.plot_workers)
     
     print("\n" + "="*70)
     print("TRAINING COMPLETE!")
     print("="*70)
     print("\nFiles generated:")
     print("  - models/*.h5 (trained models)")
-    print("  - results/*.csv (predictions and metrics)")
-    print("  - plots/*.png (comparison visualizations)")
\ No newline at end of file
+    print(f"  - results/store/{run_id}/*.npy (predictions and metrics)")
+    print("  - results/metrics_summary.csv (metrics report)")
+    if args.plots != 'none':
+        print("  - plots/*.png (comparison visualizations)")
+    
+    if instrument.enabled():
+        print(f"\nSTAGE TIMINGS ({instrument.trace_path()})")
+        print(instrument.summary_table(instrument.load(instrument.trace_path(), run_id)))
\ No newline at end of file
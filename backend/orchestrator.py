@@ -0,0 +1,109 @@
+import os
+import time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+def _init_worker(threads):
+    """Cap TensorFlow / BLAS threads so concurrent fits don't oversubscribe the CPU"""
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def run_job(data_path, dataset_name, model_name, stream=False, run_id=None, finetune=False):
+    """Prepare one dataset and train (or fine-tune) one model on it (runs inside a worker)"""
+    import ephemris_error
+    from src.instrument import span
+
+    start = time.perf_counter()
+    with span('job', model=model_name, dataset=dataset_name, finetune=finetune):
+        if finetune:
+            res = ephemris_error.finetune_model(model_name, data_path, dataset_name, run_id=run_id)
+            if res is None:
+                return None
+        else:
+            data = ephemris_error.prepare_dataset(data_path, dataset_name, ephemris_error.TARGETS[model_name])
+            res = ephemris_error.train_model(model_name, data, dataset_name, stream=stream, run_id=run_id)
+
+    # Keras models don't cross process boundaries; it's already saved under models/
+    res.pop('model')
+    res['wall_time'] = time.perf_counter() - start
+    return res
+
+
+def train_parallel(datasets, workers=None, threads=None, stream=False, models=None, run_id=None,
+                   finetune=False):
+    """
+    Fan the (dataset x model) grid out to a process pool (finetune=True
+    refreshes the registered models instead of training new ones).
+
+    Each worker gets `threads` TensorFlow threads (default: cpu_count / workers).
+    Returns {dataset: {model: result}} in the same shape as train_all_models.
+    """
+    import ephemris_error
+
+    models = list(models or ephemris_error.MODELS)
+    run_id = run_id or ephemris_error.RESULTS.new_run_id()
+
+    jobs = []
+    for data_path, dataset_name in datasets:
+        if not os.path.exists(data_path):
+            print(f"File not found: {data_path}")
+            continue
+        for model_name in models:
+            jobs.append((data_path, dataset_name, model_name))
+
+    if not jobs:
+        return {}
+
+    cpus = os.cpu_count() or 1
+    workers = min(workers or cpus, len(jobs))
+    threads = threads or max(1, cpus // workers)
+    print(f"Running {len(jobs)} jobs on {workers} workers x {threads} threads")
+
+    all_results = {}
+    timings = []
+    start = time.perf_counter()
+
+    # spawn: TensorFlow is not fork-safe once its runtime has started
+    ctx = mp.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=_init_worker, initargs=(threads,)) as pool:
+        futures = {pool.submit(run_job, data_path, dataset_name, model_name, stream, run_id, finetune):
+                   (dataset_name, model_name)
+                   for data_path, dataset_name, model_name in jobs}
+
+        for future in as_completed(futures):
+            dataset_name, model_name = futures[future]
+            try:
+                res = future.result()
+            except Exception as e:
+                print(f"Error processing {model_name} on {dataset_name}: {e}")
+                continue
+            if res is None:
+                continue
+
+            all_results.setdefault(dataset_name, {})[model_name] = res
+            timings.append((dataset_name, model_name, res['wall_time']))
+            print(f"  ✓ {model_name} on {dataset_name} done in {res['wall_time']:.1f}s")
+
+    elapsed = time.perf_counter() - start
+    ephemris_error.RESULTS.commit()
+
+    # Keep the model order stable for the summary table
+    all_results = {
+        dataset_name: {m: all_results[dataset_name][m] for m in models if m in all_results[dataset_name]}
+        for _, dataset_name in datasets if dataset_name in all_results
+    }
+
+    print("\nJOB WALL TIMES")
+    for dataset_name, model_name, wall_time in sorted(timings, key=lambda t: -t[2]):
+        print(f"  {dataset_name:<6} {model_name:<14} {wall_time:8.1f}s")
+    print(f"  total elapsed {elapsed:.1f}s (sum of jobs {sum(t[2] for t in timings):.1f}s)")
+
+    return all_results
@@ -0,0 +1,151 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from response_cache import file_signature
+
+# Named widths (px) for ?size=; full means the stored 300 dpi figure
+SIZES = {'thumb': 320, 'small': 640, 'medium': 1200}
+MIN_WIDTH, MAX_WIDTH = 64, 4000
+
+FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+
+class PlotCache:
+    """
+    Disk cache of plot variants (size / format), evicted least-recently-used
+    once the directory grows past `max_bytes`.
+
+    Files are named by a key that hashes everything the variant was drawn
+    from, so a stale variant is never served; it just stops being requested
+    and ages out. Recency survives restarts through the files' mtimes. Where
+    the directory can't be written, variants go to a per-process temp dir.
+    """
+
+    def __init__(self, cache_dir, max_bytes=200 * 2**20):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._files = OrderedDict()   # name -> size, oldest first
+        self._size = 0
+        self._lock = threading.Lock()
+        # pyplot keeps global state; one render at a time per process
+        self._render_lock = threading.Lock()
+
+        # The directory is created on the first miss, not at import (read-only deploys)
+        self._prepared = False
+        if os.path.isdir(cache_dir):
+            self._scan()
+
+    def _scan(self):
+        existing = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.tmp'):
+                continue
+            st = os.stat(os.path.join(self.cache_dir, name))
+            existing.append((st.st_mtime, name, st.st_size))
+        for _, name, size in sorted(existing):
+            self._files[name] = size
+            self._size += size
+
+    def _prepare(self):
+        """Make sure variants can be written, falling back to a temp dir"""
+        with self._lock:
+            if self._prepared:
+                return
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                writable = os.access(self.cache_dir, os.W_OK)
+            except OSError:
+                writable = False
+            if not writable:
+                fallback = tempfile.mkdtemp(prefix='plot-cache-')
+                print(f"Plot cache {self.cache_dir} is not writable, using {fallback}")
+                self.cache_dir = fallback
+                self._files.clear()
+                self._size = 0
+            self._prepared = True
+
+    @staticmethod
+    def key(*parts):
+        return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+    def get(self, key, fmt, render):
+        """Path of the cached variant, calling render(tmp_path) to create it on a miss"""
+        name = f"{key}.{fmt}"
+
+        with self._lock:
+            hit = name in self._files
+            if hit:
+                self._files.move_to_end(name)
+            path = os.path.join(self.cache_dir, name)
+        if hit and os.path.exists(path):
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            return path
+
+        self._prepare()
+        path = os.path.join(self.cache_dir, name)
+        with self._render_lock:
+            if not os.path.exists(path):
+                tmp = path + '.tmp'
+                render(tmp)
+                os.replace(tmp, path)
+
+        size = os.path.getsize(path)
+        with self._lock:
+            self._size += size - self._files.pop(name, 0)
+            self._files[name] = size
+            self._evict()
+        return path
+
+    def _evict(self):
+        # Called with the lock held; never drops the entry just added
+        while self._size > self.max_bytes and len(self._files) > 1:
+            name, size = self._files.popitem(last=False)
+            self._size -= size
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            for name in self._files:
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    pass
+            self._files.clear()
+            self._size = 0
+
+
+def requested_width(args):
+    """Target width in px from ?size= / ?width=, or None for the full-size figure"""
+    size = args.get('size')
+    if size and size != 'full':
+        if size not in SIZES:
+            raise ValueError(f"size must be one of {', '.join(['full', *SIZES])}")
+        return SIZES[size]
+    width = args.get('width', type=int)
+    if width is not None:
+        return min(max(width, MIN_WIDTH), MAX_WIDTH)
+    return None
+
+
+def resize_png(src, dst, width):
+    """Downscale a stored PNG (plots without results-store inputs)"""
+    from PIL import Image
+
+    with Image.open(src) as im:
+        if im.width > width:
+            im = im.resize((width, max(1, round(im.height * width / im.width))), Image.LANCZOS)
+        im.save(dst, format='PNG', optimize=True)
+
+
+def static_signature(path):
+    # mtime + size is enough to tell a re-rendered file apart
+    return file_signature([path])[0][1:]
@@ -0,0 +1,396 @@
+"""
+Plot stage: renders every figure from the results store, after training.
+
+Training only writes predictions, metrics and loss histories to the store;
+this stage turns the latest entry per (dataset, model) into
+residuals_*.png, comparison_*.png and the clock figures. Figures render in
+a process pool and are skipped when their inputs haven't changed (a
+fingerprint per file is kept in plots/.manifest.json).
+
+matplotlib is only imported by the renderers, so `--plots none` runs never
+load it.
+
+    python plots.py [--dataset GEO] [--preview] [--force] [--workers 4]
+"""
+import hashlib
+import json
+import os
+import time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from results_store import ResultsStore
+from src.instrument import span
+
+# dpi per render mode; 'none' renders nothing
+PLOT_MODES = {'full': 300, 'preview': 72, 'none': None}
+
+# Bump when a renderer changes so every figure is redrawn once
+PLOT_VERSION = 1
+
+MANIFEST = '.manifest.json'
+
+TARGET_LABELS = {
+    'radial': 'Radial Error (m)',
+    'clock': 'Clock Error (m)',
+}
+
+
+def entry_target(entry):
+    # Entries written before targets were stored are orbit models, apart from Clock
+    return entry.get('target') or ('clock' if entry['model'] == 'Clock' else 'radial')
+
+
+# -------------------------------
+# Which figures exist, and from what
+# -------------------------------
+def plan(store, dataset=None):
+    """[(kind, filename, entries)] for the latest entry of every (dataset, model)"""
+    jobs = []
+    groups = {}
+    for entry in store.latest(dataset):
+        name, model = entry['dataset'], entry['model']
+        jobs.append(('residuals', f"residuals_{model.lower()}_{name}.png", [entry]))
+        groups.setdefault((name, entry_target(entry)), []).append(entry)
+
+        if model == 'Clock':
+            jobs.append(('clock_prediction', f"clock_error_prediction_{name}.png", [entry]))
+            if entry.get('history'):
+                jobs.append(('clock_loss', f"clock_error_loss_{name}.png", [entry]))
+            if 'mc_std' in entry.get('aux', {}):
+                jobs.append(('clock_uncertainty', f"clock_uncertainity_{name}.png", [entry]))
+
+    for (name, target), entries in groups.items():
+        suffix = name if target == 'radial' else f"{target}_{name}"
+        jobs.append(('comparison', f"comparison_{suffix}.png", entries))
+    return jobs
+
+
+def find(store, filename):
+    """(kind, entries) behind a figure name such as residuals_lstm_GEO.png, or None"""
+    dataset = filename.rsplit('_', 1)[-1].split('.')[0]
+    for kind, name, entries in plan(store, dataset):
+        if name == filename:
+            return kind, entries
+    return None
+
+
+def fingerprint(kind, entries, dpi):
+    # Entry files never change once written (attach() adds new aux paths), so
+    # the entry metadata identifies the arrays behind a figure
+    payload = json.dumps([PLOT_VERSION, kind, dpi, entries], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def load_manifest(path):
+    """{filename: fingerprint} of the figures last rendered into a plots dir"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(plots_dir, manifest):
+    path = os.path.join(plots_dir, MANIFEST)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+# -------------------------------
+# Rendering (runs in the workers)
+# -------------------------------
+_STORES = {}
+
+
+def _render(root, plots_dir, kind, filename, entries, dpi):
+    store = _STORES.get(root)
+    if store is None:
+        store = _STORES[root] = ResultsStore(root)
+    with span('plot', kind=kind, figure=filename, dpi=dpi):
+        render_figure(store, kind, entries, os.path.join(plots_dir, filename), dpi)
+    return filename
+
+
+def render_figure(store, kind, entries, path, dpi=None, format=None, width=None):
+    """
+    Draw one figure to `path` (format from the extension unless given, e.g.
+    'svg'). `width` (px) picks the dpi that gives roughly that image width.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig = RENDERERS[kind](plt, store, entries)
+    if width:
+        dpi = width / fig.get_figwidth()
+    try:
+        fig.savefig(path, dpi=dpi, bbox_inches='tight', format=format)
+    finally:
+        plt.close(fig)
+    return path
+
+
+def plot_residuals(plt, store, entries, max_points=5000):
+    """Histogram, Q-Q and residual-vs-predicted panels drawn from a subsample"""
+    from scipy import stats
+    from src.residuals import ResidualStats
+
+    entry, = entries
+    arr = store.array(entry)
+    y_pred, residuals = np.asarray(arr[:, 1], dtype=np.float64), np.asarray(arr[:, 2], dtype=np.float64)
+
+    # Same stratified sample as the normality test at training time
+    n_steps = len(entry.get('residuals', {}).get('count', [1]))
+    if len(residuals) % n_steps:
+        n_steps = 1
+    sample = ResidualStats.from_residuals(residuals.reshape(-1, n_steps), n_steps, seed=0).pooled().normality_sample()
+    mu, sigma = np.mean(sample), np.std(sample)
+    shapiro_p = entry.get('shapiro_p')
+    if shapiro_p is None:
+        shapiro_p = stats.shapiro(sample)[1]
+
+    keep = np.isfinite(residuals)
+    y_pred, residuals = y_pred[keep], residuals[keep]
+    if len(residuals) > max_points:
+        idx = np.random.default_rng(0).choice(len(residuals), max_points, replace=False)
+        y_pred, residuals = y_pred[idx], residuals[idx]
+
+    fig, axes = plt.subplots(1, 3, figsize=(15, 4))
+    fig.suptitle(f"Residual Analysis - {entry['model']} ({entry['dataset']})", fontsize=14, fontweight='bold')
+
+    # 1. Histogram with normal curve overlay
+    ax = axes[0]
+    ax.hist(sample, bins=50, density=True, alpha=0.7, color='blue', edgecolor='black')
+    x = np.linspace(sample.min(), sample.max(), 100)
+    ax.plot(x, stats.norm.pdf(x, mu, sigma), 'r-', linewidth=2, label='Normal curve')
+    ax.set_title(f'Histogram\nShapiro p={shapiro_p:.4f}')
+    ax.set_xlabel('Residual (m)')
+    ax.set_ylabel('Density')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+
+    # 2. Q-Q Plot (most important!)
+    ax = axes[1]
+    stats.probplot(sample, dist="norm", plot=ax)
+    ax.set_title('Q-Q Plot\n')
+    ax.grid(True, alpha=0.3)
+
+    # 3. Residuals vs Predicted (check for patterns)
+    ax = axes[2]
+    ax.scatter(y_pred, residuals, alpha=0.3, s=10)
+    ax.axhline(y=0, color='r', linestyle='--', linewidth=2)
+    ax.set_title('Residuals vs Predicted\n')
+    ax.set_xlabel('Predicted Value (m)')
+    ax.set_ylabel('Residual (m)')
+    ax.grid(True, alpha=0.3)
+
+    fig.tight_layout()
+    return fig
+
+
+def plot_comparison(plt, store, entries):
+    """Predictions, error distributions, validation loss and metrics of every model on a dataset"""
+    dataset_name, target = entries[0]['dataset'], entry_target(entries[0])
+    label = TARGET_LABELS[target]
+
+    fig, axes = plt.subplots(2, 2, figsize=(15, 10))
+    fig.suptitle(f'Model Comparison - {dataset_name}' + ('' if target == 'radial' else f' ({target})'), fontsize=16)
+
+    # 1. Predictions comparison
+    ax = axes[0, 0]
+    for entry in entries:
+        arr = store.read(entry, 0, 100)  # First 100 points
+        ax.plot(arr[:, 1], label=f"{entry['model']} (pred)", alpha=0.7)
+    ax.plot(arr[:, 0], 'k--', label='True', linewidth=2)
+    ax.set_title('Predictions Comparison')
+    ax.set_xlabel('Time Step')
+    ax.set_ylabel(label)
+    ax.legend()
+    ax.grid(True)
+
+    # 2. Error distributions
+    ax = axes[0, 1]
+    for entry in entries:
+        ax.hist(store.array(entry)[:, 2], bins=30, alpha=0.5, label=entry['model'])
+    ax.set_title('Error Distributions')
+    ax.set_xlabel('Error (m)')
+    ax.set_ylabel('Count')
+    ax.legend()
+    ax.grid(True)
+
+    # 3. Training history (entries imported from CSV don't have one)
+    ax = axes[1, 0]
+    for entry in entries:
+        history = entry.get('history') or {}
+        if 'val_loss' in history:
+            ax.plot(history['val_loss'], label=entry['model'])
+    ax.set_title('Validation Loss')
+    ax.set_xlabel('Epoch')
+    ax.set_ylabel('Loss')
+    if ax.lines:
+        ax.legend()
+    ax.grid(True)
+    ax.set_yscale('log')
+
+    # 4. Metrics comparison
+    ax = axes[1, 1]
+    model_names = [e['model'] for e in entries]
+    rmses = [e.get('rmse') or 0.0 for e in entries]
+    maes = [e.get('mae') or 0.0 for e in entries]
+
+    x = np.arange(len(model_names))
+    width = 0.35
+    ax.bar(x - width/2, rmses, width, label='RMSE', alpha=0.8)
+    ax.bar(x + width/2, maes, width, label='MAE', alpha=0.8)
+    ax.set_title('Metrics Comparison')
+    ax.set_ylabel('Error (m)')
+    ax.set_xticks(x)
+    ax.set_xticklabels(model_names)
+    ax.legend()
+    ax.grid(True, axis='y')
+
+    fig.tight_layout()
+    return fig
+
+
+def plot_clock_prediction(plt, store, entries, samples=50):
+    entry, = entries
+    arr = store.read(entry, 0, samples)
+
+    fig = plt.figure(figsize=(12, 5))
+    plt.plot(arr[:, 0], label='Actual', marker='o')
+    plt.plot(arr[:, 1], label='Predicted', marker='s')
+    plt.title('Clock Error Prediction - LSTM')
+    plt.xlabel('Sample')
+    plt.ylabel('Clock Error (m)')
+    plt.legend()
+    plt.grid(True)
+    fig.tight_layout()
+    return fig
+
+
+def plot_clock_loss(plt, store, entries):
+    entry, = entries
+    history = entry['history']
+
+    fig = plt.figure(figsize=(10, 4))
+    plt.plot(history['loss'], label='Train Loss')
+    plt.plot(history['val_loss'], label='Validation Loss')
+    plt.title('Training Loss')
+    plt.xlabel('Epoch')
+    plt.ylabel('Huber Loss')
+    plt.legend()
+    plt.grid(True)
+    fig.tight_layout()
+    return fig
+
+
+def plot_clock_uncertainty(plt, store, entries, samples=50):
+    """MC dropout mean +- std, stored with the entry by clock_error.py"""
+    entry, = entries
+    y_true = store.read(entry, 0, samples)[:, 0]
+    y_mean = store.aux(entry, 'mc_mean')[:samples]
+    y_std = store.aux(entry, 'mc_std')[:samples]
+    samples = min(len(y_true), len(y_mean))
+
+    fig = plt.figure(figsize=(12, 5))
+    plt.plot(y_true[:samples], label='Actual', marker='o')
+    plt.plot(y_mean[:samples], label='Predicted', marker='s')
+    plt.fill_between(range(samples),
+                     y_mean[:samples] - y_std[:samples],
+                     y_mean[:samples] + y_std[:samples],
+                     color='orange', alpha=0.3, label='Uncertainty')
+    plt.title('Clock Error Prediction - LSTM with Uncertainty')
+    plt.xlabel('Sample')
+    plt.ylabel('Clock Error (m)')
+    plt.legend()
+    plt.grid(True)
+    fig.tight_layout()
+    return fig
+
+
+RENDERERS = {
+    'residuals': plot_residuals,
+    'comparison': plot_comparison,
+    'clock_prediction': plot_clock_prediction,
+    'clock_loss': plot_clock_loss,
+    'clock_uncertainty': plot_clock_uncertainty,
+}
+
+
+# -------------------------------
+# Stage
+# -------------------------------
+def render_plots(store, plots_dir='plots', mode='full', dataset=None, workers=None, force=False):
+    """
+    Render every stale figure for the latest results.
+
+    mode is 'full' (300 dpi), 'preview' (72 dpi) or 'none'. Figures whose
+    inputs and dpi match the manifest are skipped unless force=True.
+    workers=1 renders in-process. Returns the filenames rendered.
+    """
+    dpi = PLOT_MODES[mode]
+    if dpi is None or not store.exists():
+        return []
+
+    os.makedirs(plots_dir, exist_ok=True)
+    manifest = load_manifest(os.path.join(plots_dir, MANIFEST))
+
+    todo = []
+    for kind, filename, entries in plan(store, dataset):
+        fp = fingerprint(kind, entries, dpi)
+        if not force and manifest.get(filename) == fp and os.path.exists(os.path.join(plots_dir, filename)):
+            continue
+        todo.append((kind, filename, entries, fp))
+
+    if not todo:
+        print(f"  Plots up to date ({plots_dir})")
+        return []
+
+    start = time.perf_counter()
+    done = []
+    workers = min(workers or os.cpu_count() or 1, len(todo))
+    if workers == 1:
+        for kind, filename, entries, fp in todo:
+            _render(store.root, plots_dir, kind, filename, entries, dpi)
+            manifest[filename] = fp
+            done.append(filename)
+    else:
+        # spawn: the parent usually has TensorFlow loaded, which isn't fork-safe
+        ctx = mp.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            futures = {pool.submit(_render, store.root, plots_dir, kind, filename, entries, dpi): (filename, fp)
+                       for kind, filename, entries, fp in todo}
+            for future in as_completed(futures):
+                filename, fp = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"  Error rendering {filename}: {e}")
+                    continue
+                manifest[filename] = fp
+                done.append(filename)
+
+    _save_manifest(plots_dir, manifest)
+    print(f"  ✓ Rendered {len(done)} plots to {plots_dir}/ at {dpi} dpi in {time.perf_counter() - start:.1f}s")
+    return done
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render plots from the results store")
+    parser.add_argument('--store', default="results/store")
+    parser.add_argument('--out', default="plots")
+    parser.add_argument('--dataset', default=None)
+    parser.add_argument('--preview', action='store_true', help=f"low-res ({PLOT_MODES['preview']} dpi) figures")
+    parser.add_argument('--force', action='store_true', help="re-render even when inputs are unchanged")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    render_plots(ResultsStore(args.store), args.out, mode='preview' if args.preview else 'full',
+                 dataset=args.dataset, workers=args.workers, force=args.force)
@@ -0,0 +1,109 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from flask import Response, request
+
+
+def file_signature(paths):
+    """(path, mtime, size) of each path; missing files count as None"""
+    sig = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            sig.append((path, st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            sig.append((path, None, None))
+    return tuple(sig)
+
+
+class CachedResponse:
+    """A JSON payload serialized once, with its gzip body and ETag"""
+
+    def __init__(self, payload, deps):
+        self.deps = list(deps)
+        self.signature = file_signature(self.deps)
+        self.body = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        self.gzipped = gzip.compress(self.body, compresslevel=6)
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest() + '"'
+
+
+class ResponseCache:
+    """
+    In-process cache of JSON API responses keyed by request and source files.
+
+    `build()` returns (payload, deps) where deps are the files / directories the
+    payload was read from, or None for responses that shouldn't be cached (errors).
+    An entry is reused until any dep's mtime or size changes, so results rewritten
+    by the training pipeline are picked up on the next request.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and file_signature(entry.deps) == entry.signature:
+            with self._lock:
+                self._entries.move_to_end(key)
+            return entry
+
+        built = build()
+        if built is None:
+            return None
+
+        entry = CachedResponse(*built)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def cached_json(entry):
+    """Flask response for a cached entry, honouring If-None-Match and Accept-Encoding"""
+    headers = {
+        'ETag': entry.etag,
+        'Cache-Control': 'no-cache',
+        'Vary': 'Accept-Encoding',
+    }
+
+    if entry.etag in request.headers.get('If-None-Match', ''):
+        return Response(status=304, headers=headers)
+
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        headers['Content-Encoding'] = 'gzip'
+        return Response(entry.gzipped, mimetype='application/json', headers=headers)
+
+    return Response(entry.body, mimetype='application/json', headers=headers)
+
+
+class FileCache:
+    """Parsed file contents, reused until the file's mtime or size changes"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path, loader):
+        signature = file_signature([path])
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+
+        value = loader(path)
+        with self._lock:
+            self._entries[path] = (signature, value)
+        return value
@@ -0,0 +1,194 @@
+import glob
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Column order of every predictions array
+COLUMNS = ('y_true', 'y_pred', 'error')
+
+
+class ResultsStore:
+    """
+    Columnar store of prediction results, one run per training session.
+
+    Layout:
+        <root>/<run_id>/<dataset>_<model>.npy    float32 (rows, 3): y_true, y_pred, error
+        <root>/<run_id>/<dataset>_<model>.json   typed metrics for that entry
+        <root>/<run_id>/<dataset>_<model>.<key>.npy  optional extra float32 columns (attach())
+        <root>/index.json                        all entries + latest run per (dataset, model)
+
+    Arrays are opened with np.load(mmap_mode='r'), so reading a slice only
+    touches those rows. Entry files are written independently (safe from
+    parallel workers); commit() rebuilds the index.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._index = None
+        self._index_sig = None
+        self._arrays = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_run_id():
+        return datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+
+    @property
+    def index_path(self):
+        return os.path.join(self.root, 'index.json')
+
+    # -------------------------------
+    # Writing
+    # -------------------------------
+    def write(self, run_id, dataset, model, y_true, y_pred, **metrics):
+        """Store one model's predictions and metrics for a run"""
+        run_dir = os.path.join(self.root, run_id)
+        os.makedirs(run_dir, exist_ok=True)
+        name = f"{dataset}_{model.lower()}"
+
+        y_true = np.asarray(y_true, dtype=np.float32).ravel()
+        y_pred = np.asarray(y_pred, dtype=np.float32).ravel()
+        data = np.stack([y_true, y_pred, y_true - y_pred], axis=1)
+        np.save(os.path.join(run_dir, name + '.npy'), data)
+
+        entry = {
+            'run_id': run_id,
+            'dataset': dataset,
+            'model': model,
+            'rows': int(len(data)),
+            'path': os.path.join(run_id, name + '.npy'),
+            **{k: (float(v) if isinstance(v, (float, np.floating)) else v) for k, v in metrics.items()},
+        }
+        # Metadata last, so commit() never indexes a half-written array
+        with open(os.path.join(run_dir, name + '.json'), 'w') as f:
+            json.dump(entry, f)
+        return entry
+
+    def attach(self, run_id, dataset, model, **arrays):
+        """Store extra per-row arrays (e.g. MC dropout mean / std) with an existing entry"""
+        name = f"{dataset}_{model.lower()}"
+        entry_path = os.path.join(self.root, run_id, name + '.json')
+        with open(entry_path) as f:
+            entry = json.load(f)
+
+        aux = entry.setdefault('aux', {})
+        for key, values in arrays.items():
+            path = os.path.join(run_id, f"{name}.{key}.npy")
+            np.save(os.path.join(self.root, path), np.asarray(values, dtype=np.float32).ravel())
+            aux[key] = path
+
+        tmp = entry_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp, entry_path)
+        return entry
+
+    def commit(self):
+        """Rebuild index.json from the entry files (atomic replace)"""
+        entries = []
+        for path in sorted(glob.glob(os.path.join(self.root, '*', '*.json'))):
+            with open(path) as f:
+                entries.append(json.load(f))
+
+        latest = {}
+        for entry in entries:
+            # run ids sort chronologically
+            key = f"{entry['dataset']}/{entry['model']}"
+            if key not in latest or entry['run_id'] >= latest[key]['run_id']:
+                latest[key] = entry
+
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self.index_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'entries': entries, 'latest': latest}, f)
+        os.replace(tmp, self.index_path)
+
+    # -------------------------------
+    # Reading
+    # -------------------------------
+    def exists(self):
+        return os.path.exists(self.index_path)
+
+    def index(self):
+        """Parsed index.json, re-read only when it changes"""
+        st = os.stat(self.index_path)
+        sig = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            if self._index_sig != sig:
+                with open(self.index_path) as f:
+                    self._index = json.load(f)
+                self._index_sig = sig
+            return self._index
+
+    def latest(self, dataset=None):
+        """Latest entry per (dataset, model), optionally for one dataset"""
+        entries = self.index()['latest'].values()
+        if dataset is not None:
+            entries = [e for e in entries if e['dataset'].upper() == dataset.upper()]
+        return sorted(entries, key=lambda e: (e['dataset'], e['model']))
+
+    def runs(self, dataset=None, model=None):
+        """Every stored entry (run history), oldest first"""
+        entries = self.index()['entries']
+        if dataset is not None:
+            entries = [e for e in entries if e['dataset'].upper() == dataset.upper()]
+        if model is not None:
+            entries = [e for e in entries if e['model'].lower() == model.lower()]
+        return sorted(entries, key=lambda e: e['run_id'])
+
+    def array(self, entry):
+        """Memory-mapped (rows, 3) float32 array for an entry; run files never change"""
+        return self._mmap(entry['path'])
+
+    def aux(self, entry, key):
+        """Memory-mapped extra array stored with attach(), or None"""
+        path = entry.get('aux', {}).get(key)
+        return None if path is None else self._mmap(path)
+
+    def _mmap(self, path):
+        path = os.path.join(self.root, path)
+        with self._lock:
+            arr = self._arrays.get(path)
+            if arr is None:
+                arr = np.load(path, mmap_mode='r')
+                self._arrays[path] = arr
+        return arr
+
+    def read(self, entry, start=0, end=None):
+        """Rows [start, end) of an entry as a zero-copy view"""
+        return self.array(entry)[start:end]
+
+
+def import_csv_results(store, results_dir, run_id='00000000T000000'):
+    """Load predictions_<model>_<dataset>.csv + metrics_summary.csv into the store as one run
+
+    The default run id sorts before any real run, so newer training wins.
+    """
+    import pandas as pd
+
+    metrics = {}
+    summary_path = os.path.join(results_dir, 'metrics_summary.csv')
+    if os.path.exists(summary_path):
+        for row in pd.read_csv(summary_path).to_dict('records'):
+            metrics[(row['Dataset'], row['Model'].lower())] = {
+                'rmse': float(str(row['RMSE (m)']).replace('m', '')),
+                'mae': float(str(row['MAE (m)']).replace('m', '')),
+                'shapiro_p': float(row['Shapiro p']) if 'Shapiro p' in row else None,
+            }
+
+    names = {m.lower(): m for m in ('LSTM', 'Transformer', 'Probabilistic')}
+    for path in sorted(glob.glob(os.path.join(results_dir, 'predictions_*_*.csv'))):
+        _, model, dataset = os.path.basename(path)[:-4].split('_', 2)
+        df = pd.read_csv(path)
+        store.write(run_id, dataset, names.get(model, model), df['y_true'], df['y_pred'],
+                    **metrics.get((dataset, model), {}))
+    store.commit()
+
+
+if __name__ == "__main__":
+    # One-off migration of CSV results: python results_store.py
+    base = os.path.dirname(os.path.abspath(__file__))
+    import_csv_results(ResultsStore(os.path.join(base, 'results', 'store')), os.path.join(base, 'results'))
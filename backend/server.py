@@ -1,32 +1,144 @@
-from flask import Flask, send_file, jsonify, send_from_directory
+from flask import Flask, Response, send_file, jsonify, send_from_directory, request
 from flask_cors import CORS
 import pandas as pd
 import os
 
+import plots
+from downsample import downsample_range
+from plot_cache import FORMATS, PlotCache, requested_width, resize_png, static_signature
+from response_cache import FileCache, ResponseCache, cached_json
+from results_store import COLUMNS, ResultsStore
+
 app = Flask(__name__)
 CORS(app)
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# Serialized /api/metrics and /api/predictions bodies, invalidated on file mtime
+response_cache = ResponseCache()
+# Parsed prediction CSVs (and the plot manifest), shared across requests
+frame_cache = FileCache()
+
+# Typed results written by training; the CSVs above are only a fallback for older runs
+results_store = ResultsStore(os.path.join(BASE_DIR, 'results', 'store'))
+
+PLOTS_DIR = os.path.join(BASE_DIR, 'plots')
+# Thumbnails / SVGs / re-renders, LRU on disk
+plot_cache = PlotCache(os.path.join(PLOTS_DIR, '.cache'))
+# Browsers may reuse a plot this long before revalidating with its ETag
+PLOT_MAX_AGE = 300
+
 @app.route('/api/health')
 def health():
     return jsonify({"status": "ok"})
 
 @app.route('/api/plots/<filename>')
 def get_plot(filename):
-    """Serve any plot image"""
-    plot_path = os.path.join(BASE_DIR, 'plots', filename)
-    if os.path.exists(plot_path):
-        return send_file(plot_path, mimetype='image/png')
-    return jsonify({"error": f"Plot not found: {filename}"}), 404
+    """
+    Serve a plot image.
 
-@app.route('/api/metrics')
-def get_metrics():
-    """Get all metrics from metrics_summary.csv"""
+    Query params: size (thumb / small / medium / full) or width (px), and
+    format (png / svg). Figures with inputs in the results store are drawn
+    on demand at that size; older ones are downscaled from plots/. Every
+    variant is cached on disk and served with an ETag.
+    """
+    base, ext = os.path.splitext(filename)
+    fmt = request.args.get('format', ext.lstrip('.') or 'png').lower()
+    if os.path.basename(filename) != filename or fmt not in FORMATS:
+        return jsonify({"error": f"Plot not found: {filename}"}), 404
+    try:
+        width = requested_width(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    png_name = base + '.png'
+    plot_path = os.path.join(PLOTS_DIR, png_name)
+    try:
+        return plot_variant(filename, png_name, plot_path, fmt, width)
+    except ImportError as e:
+        # matplotlib / Pillow missing: the stored full-size PNG is still better than nothing
+        if fmt == 'png' and os.path.exists(plot_path):
+            return send_file(plot_path, mimetype=FORMATS[fmt])
+        return jsonify({"error": f"Plot rendering unavailable: {e}"}), 503
+
+def plot_variant(filename, png_name, plot_path, fmt, width):
+    """Response for one size / format of a plot, drawn or downscaled through the plot cache"""
+    source = plots.find(results_store, png_name) if results_store.exists() else None
+
+    if source is not None:
+        kind, entries = source
+        dpi = plots.PLOT_MODES['full']
+        fingerprint = plots.fingerprint(kind, entries, dpi)
+        manifest = frame_cache.get(os.path.join(PLOTS_DIR, plots.MANIFEST), plots.load_manifest)
+
+        if width is None and fmt == 'png' and manifest.get(png_name) == fingerprint and os.path.exists(plot_path):
+            # The plot stage already drew this exact figure
+            return plot_response(plot_path, fingerprint, fmt)
+
+        # SVG is vector; its size doesn't depend on the requested width
+        key = plot_cache.key(fingerprint, None if fmt == 'svg' else width, fmt)
+        path = plot_cache.get(key, fmt, lambda tmp: plots.render_figure(
+            results_store, kind, entries, tmp, dpi=dpi, format=fmt, width=width))
+        return plot_response(path, key, fmt)
+
+    if not os.path.exists(plot_path):
+        return jsonify({"error": f"Plot not found: {filename}"}), 404
+    if fmt != 'png':
+        return jsonify({"error": f"{filename} has no stored results to draw a {fmt} from"}), 404
+
+    key = plot_cache.key(png_name, static_signature(plot_path), width)
+    if width is None:
+        return plot_response(plot_path, key, fmt)
+    path = plot_cache.get(key, fmt, lambda tmp: resize_png(plot_path, tmp, width))
+    return plot_response(path, key, fmt)
+
+def plot_response(path, key, fmt):
+    """Image response with ETag / Cache-Control, 304 when the browser's copy is current"""
+    headers = {
+        'ETag': f'"{key}"',
+        'Cache-Control': f'public, max-age={PLOT_MAX_AGE}',
+    }
+    if headers['ETag'] in request.headers.get('If-None-Match', ''):
+        return Response(status=304, headers=headers)
+
+    response = send_file(path, mimetype=FORMATS[fmt], conditional=False, etag=False, max_age=PLOT_MAX_AGE)
+    response.headers.update(headers)
+    return response
+
+# Trained on every satellite at once, with its own window lengths; its rows
+# don't line up with the per-dataset models
+SHARED_MODELS = ('Constellation',)
+
+def dashboard_entries(dataset=None):
+    """Latest store entries the dashboard compares: per-dataset radial error models"""
+    return [entry for entry in results_store.latest(dataset)
+            if plots.entry_target(entry) == 'radial' and entry['model'] not in SHARED_MODELS]
+
+def build_store_metrics():
+    """Latest metrics per dataset / model from the results store"""
+    results = {}
+    for entry in dashboard_entries():
+        # Imported prediction CSVs without a metrics_summary.csv row carry no metrics
+        if entry.get('rmse') is None or entry.get('mae') is None:
+            continue
+        shapiro = entry.get('shapiro_p')
+        results.setdefault(entry['dataset'], {})[entry['model']] = {
+            'rmse': round(entry['rmse'], 4),
+            'mae': round(entry['mae'], 4),
+            'shapiro_p': round(shapiro, 4) if shapiro is not None else None,
+            'normal': shapiro > 0.05 if shapiro is not None else False
+        }
+    return results, [results_store.index_path]
+
+def build_metrics():
+    """Parse metrics_summary.csv into {dataset: {model: metrics}}"""
+    if results_store.exists():
+        return build_store_metrics()
+    
     csv_path = os.path.join(BASE_DIR, 'results', 'metrics_summary.csv')
     
     if not os.path.exists(csv_path):
-        return jsonify({"error": "Metrics file not found"}), 404
+        return None
     
     df = pd.read_csv(csv_path)
     
@@ -55,15 +167,32 @@ def get_metrics():
             print(f"Error parsing row: {e}")
             continue
     
-    return jsonify(results)
+    return results, [csv_path]
 
-@app.route('/api/predictions/<dataset>')
-def get_predictions(dataset):
-    """Get predictions for a specific dataset (handles multiple models)"""
+@app.route('/api/metrics')
+def get_metrics():
+    """Get all metrics from metrics_summary.csv"""
+    entry = response_cache.get('metrics', build_metrics)
+    if entry is None:
+        return jsonify({"error": "Metrics file not found"}), 404
+    return cached_json(entry)
+
+def build_predictions(dataset, start=0, end=None, points=500):
+    """
+    Read every predictions_<model>_<dataset>.csv into {model: records}.
+
+    Rows [start, end) are downsampled (LTTB over y_true / y_pred / error) to
+    about `points`; each record carries its row `index`.
+    """
+    if results_store.exists() and dashboard_entries(dataset):
+        return build_store_predictions(dataset, start, end, points)
+    
     results = {}
     
     # Try to find all prediction files for this dataset
     results_dir = os.path.join(BASE_DIR, 'results')
+    # The directory itself is a dependency so added / removed files invalidate too
+    deps = [results_dir]
     
     for filename in os.listdir(results_dir):
         if filename.startswith('predictions_') and dataset.upper() in filename.upper() and filename.endswith('.csv'):
@@ -72,25 +201,60 @@ def get_predictions(dataset):
             model_name = parts[1] if len(parts) > 2 else 'lstm'
             
             csv_path = os.path.join(results_dir, filename)
-            df = pd.read_csv(csv_path)
+            df = frame_cache.get(csv_path, pd.read_csv)
+            deps.append(csv_path)
             
-            # Limit to first 500 points for performance
-            results[model_name] = df.head(500).to_dict('records')
+            idx = downsample_range(df[['y_true', 'y_pred', 'error']].to_numpy(), start, end, points)
+            view = df.iloc[idx]
+            view.insert(0, 'index', idx)
+            results[model_name] = view.to_dict('records')
     
     if not results:
-        return jsonify({"error": f"No predictions found for {dataset}"}), 404
+        return None
     
-    return jsonify(results)
+    return results, deps
 
-@app.route('/api/available-plots')
-def available_plots():
-    """List all available plots grouped by type and dataset"""
-    plots_dir = os.path.join(BASE_DIR, 'plots')
-    
-    if not os.path.exists(plots_dir):
-        return jsonify({"error": "Plots directory not found"}), 404
+def build_store_predictions(dataset, start, end, points):
+    """Same as build_predictions, read as memory-mapped slices from the results store"""
+    results = {}
+    for entry in dashboard_entries(dataset):
+        data = results_store.array(entry)
+        idx = downsample_range(data, start, end, points)
+        rows = data[idx].tolist()
+        results[entry['model'].lower()] = [
+            {'index': int(i), **dict(zip(COLUMNS, row))} for i, row in zip(idx, rows)
+        ]
+    return results, [results_store.index_path]
+
+@app.route('/api/predictions/<dataset>')
+def get_predictions(dataset):
+    """
+    Get predictions for a specific dataset (handles multiple models).
+
+    Query params: start / end (row range, end exclusive) and points (target
+    number of points, default 500, max 5000).
+    """
+    start = request.args.get('start', default=0, type=int)
+    end = request.args.get('end', default=None, type=int)
+    points = min(max(request.args.get('points', default=500, type=int), 2), 5000)
     
-    all_plots = [f for f in os.listdir(plots_dir) if f.endswith('.png')]
+    key = ('predictions', dataset.upper(), start, end, points)
+    entry = response_cache.get(key, lambda: build_predictions(dataset, start, end, points))
+    if entry is None:
+        return jsonify({"error": f"No predictions found for {dataset}"}), 404
+    return cached_json(entry)
+
+def build_available_plots():
+    """Plot names grouped by dataset / comparison; files in plots/ plus figures the store can draw"""
+    names = set()
+    deps = [PLOTS_DIR]
+    if os.path.exists(PLOTS_DIR):
+        names.update(f for f in os.listdir(PLOTS_DIR) if f.endswith('.png'))
+    if results_store.exists():
+        names.update(filename for _, filename, _ in plots.plan(results_store))
+        deps.append(results_store.index_path)
+    if not names and not os.path.exists(PLOTS_DIR):
+        return None
     
     # Group plots by category
     grouped = {
@@ -101,7 +265,7 @@ def available_plots():
         'other': []
     }
     
-    for plot in all_plots:
+    for plot in sorted(names):
         if 'GEO' in plot.upper():
             grouped['GEO'].append(plot)
         elif 'MEO1' in plot.upper():
@@ -113,7 +277,78 @@ def available_plots():
         else:
             grouped['other'].append(plot)
     
-    return jsonify(grouped)
+    return grouped, deps
+
+@app.route('/api/available-plots')
+def available_plots():
+    """List all available plots grouped by type and dataset"""
+    entry = response_cache.get('available-plots', build_available_plots)
+    if entry is None:
+        return jsonify({"error": "Plots directory not found"}), 404
+    return cached_json(entry)
+
+# Forecast models are loaded lazily, once per worker process
+_forecast_pool = None
+
+def forecast_pool():
+    """Process-wide warm model pool (TensorFlow is only imported on first forecast)"""
+    global _forecast_pool
+    if _forecast_pool is None:
+        from src.serving import ModelPool
+        _forecast_pool = ModelPool(BASE_DIR)
+    return _forecast_pool
+
+@app.route('/api/forecast/<model>/<dataset>', methods=['POST'])
+def forecast(model, dataset):
+    """Forecast the next horizon from a recent error history"""
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    
+    try:
+        from src.serving import history_frame
+        pool = forecast_pool()
+    except ImportError as e:
+        return jsonify({"error": f"Forecasting unavailable: {e}"}), 503
+    
+    try:
+        history = history_frame(payload.get('history'))
+        return jsonify(pool.forecast(model, dataset, history))
+    except KeyError as e:
+        return jsonify({"error": e.args[0]}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/api/forecast/constellation', methods=['POST'])
+def forecast_constellation():
+    """Forecast several satellites at once with the shared constellation model"""
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    
+    try:
+        from src.serving import history_frame
+        pool = forecast_pool()
+    except ImportError as e:
+        return jsonify({"error": f"Forecasting unavailable: {e}"}), 503
+    
+    try:
+        histories = payload.get('histories') or {}
+        if not isinstance(histories, dict) or not histories:
+            raise ValueError("histories must be a non-empty object of satellite: history")
+        frames = {name: history_frame(h) for name, h in histories.items()}
+        return jsonify(pool.forecast_constellation(frames))
+    except KeyError as e:
+        return jsonify({"error": e.args[0]}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/api/forecast/stats')
+def forecast_stats():
+    """Micro-batching histograms (batch size, queue wait) per model/dataset"""
+    if _forecast_pool is None:
+        return jsonify({})
+    return jsonify(_forecast_pool.batcher.stats())
 
 @app.route('/api/datasets')
 def get_datasets():
@@ -0,0 +1,87 @@
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import layers, Model
+
+from .datasets import train_val_datasets
+from .uncertainty import mc_dropout_predict
+
+# Clock-error target: hourly, 6h of orbit / clock history in, next hour out
+CLOCK_TARGET = 'satclockerror (m)'
+CLOCK_FEATURE_COLS = ['x_error (m)', 'y_error (m)', 'z_error (m)', 'radial_error',
+                      'dx', 'dy', 'dz', 'dclock']
+CLOCK_FREQ = '1h'
+CLOCK_LOOKBACK = 6
+CLOCK_HORIZON = 1
+
+_RAW_COLS = ['x_error (m)', 'y_error (m)', 'z_error (m)', CLOCK_TARGET]
+
+
+def clip_bounds(df, lower=0.01, upper=0.99):
+    """Per-column outlier clipping bounds {col: [lo, hi]} from the quantiles of a frame"""
+    q = df[_RAW_COLS].quantile([lower, upper])
+    return {c: [float(q[c].iloc[0]), float(q[c].iloc[1])] for c in _RAW_COLS}
+
+
+def add_clock_features(df, bounds=None):
+    """Clip outliers and add the radial error / first differences the clock model uses"""
+    df = df.copy()
+    bounds = bounds or clip_bounds(df)
+    for col, (lo, hi) in bounds.items():
+        df[col] = df[col].clip(lower=lo, upper=hi)
+
+    df['radial_error'] = np.sqrt(df['x_error (m)']**2 + df['y_error (m)']**2 + df['z_error (m)']**2)
+    df['dx'] = df['x_error (m)'].diff().fillna(0)
+    df['dy'] = df['y_error (m)'].diff().fillna(0)
+    df['dz'] = df['z_error (m)'].diff().fillna(0)
+    df['dclock'] = df[CLOCK_TARGET].diff().fillna(0)
+    return df
+
+
+class ClockErrorModel:
+    """Stacked LSTM for the satellite clock error (Huber loss)"""
+
+    def __init__(self, input_shape, output_steps):
+        self.model = self._build(input_shape, output_steps)
+
+    def _build(self, input_shape, output_steps):
+        inputs = layers.Input(shape=input_shape)
+        x = layers.LSTM(64, return_sequences=True)(inputs)
+        x = layers.Dropout(0.2)(x)
+        x = layers.LSTM(32)(x)
+        x = layers.Dropout(0.2)(x)
+        x = layers.Dense(16, activation='relu')(x)
+        outputs = layers.Dense(output_steps)(x)
+
+        model = Model(inputs, outputs)
+        model.compile(optimizer='adam', loss=tf.keras.losses.Huber(), metrics=['mae'])
+        return model
+
+    def train(self, X, y, epochs=100, batch_size=16, val_split=0.2):
+        if y.ndim == 3:
+            y = y.squeeze(-1)
+
+        callbacks = [
+            tf.keras.callbacks.EarlyStopping(patience=20, restore_best_weights=True, verbose=0)
+        ]
+
+        return self.model.fit(X, y, epochs=epochs, batch_size=batch_size,
+                            validation_split=val_split, callbacks=callbacks, verbose=0)
+
+    def train_stream(self, X, y, seq_length, n_future, epochs=100, batch_size=16, val_split=0.2):
+        """Train on windows generated on the fly from the scaled series (tf.data)"""
+        train_ds, val_ds = train_val_datasets(X, y, seq_length, n_future,
+                                              batch_size=batch_size, val_split=val_split)
+
+        callbacks = [
+            tf.keras.callbacks.EarlyStopping(patience=20, restore_best_weights=True, verbose=0)
+        ]
+
+        return self.model.fit(train_ds, validation_data=val_ds, epochs=epochs,
+                            callbacks=callbacks, verbose=0)
+
+    def predict(self, X):
+        return self.model.predict(X, verbose=0)
+
+    def predict_uncertainty(self, X, n_iter=50, quantiles=(0.05, 0.95)):
+        """MC dropout forecast: returns (mean, std, {quantile: band})"""
+        return mc_dropout_predict(self.model, X, n_iter=n_iter, quantiles=quantiles)
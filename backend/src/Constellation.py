@@ -0,0 +1,113 @@
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import layers, Model
+
+from .preprocessing import create_sequences
+
+
+def stack_windows(series, seq_length, n_future):
+    """
+    Window every satellite's scaled series and stack them into one training set.
+
+    `series` is an ordered {satellite: (X_scaled, y_scaled)} mapping. Returns
+    (X, sat_ids, y) where sat_ids[i] is the position of window i's satellite
+    in `series`.
+    """
+    Xs, ids, ys = [], [], []
+    for i, (X, y) in enumerate(series.values()):
+        X_seq, y_seq = create_sequences(X, y, seq_length, n_future)
+        if len(X_seq) == 0 or y_seq.shape[1] != n_future:
+            continue
+        Xs.append(X_seq)
+        ys.append(y_seq)
+        ids.append(np.full(len(X_seq), i, dtype=np.int32))
+
+    if not Xs:
+        raise ValueError(f"No series has {seq_length + n_future} samples")
+    return np.concatenate(Xs), np.concatenate(ids), np.concatenate(ys)
+
+
+def split_windows(sat_ids, val_split):
+    """
+    Time-ordered train / validation split of stacked windows (see stack_windows).
+
+    The last `val_split` of each satellite's windows is held out, like the
+    tail split the single-satellite models use. Returns (train_idx, val_idx).
+    """
+    train_idx, val_idx = [], []
+    for i in np.unique(sat_ids):
+        # stack_windows keeps each satellite's windows contiguous and in time order
+        idx = np.flatnonzero(sat_ids == i)
+        n_val = int(len(idx) * val_split)
+        train_idx.append(idx[:len(idx) - n_val])
+        val_idx.append(idx[len(idx) - n_val:])
+    return np.concatenate(train_idx), np.concatenate(val_idx)
+
+
+class ConstellationModel:
+    """
+    Shared-weights LSTM for many satellites at once.
+
+    A learned satellite embedding is fed alongside every time step (and to the
+    output head), so one set of LSTM weights serves the whole constellation.
+    Adding a satellite only adds one `embed_dim` row, up to `capacity` slots.
+    """
+
+    def __init__(self, input_shape, output_steps, satellites, embed_dim=8, capacity=64):
+        self.satellites = list(satellites)
+        self.capacity = max(capacity, len(self.satellites))
+        self.model = self._build(input_shape, output_steps, embed_dim)
+
+    def _build(self, input_shape, output_steps, embed_dim):
+        seq_length, _ = input_shape
+
+        inputs = layers.Input(shape=input_shape, name='window')
+        sat = layers.Input(shape=(1,), dtype='int32', name='satellite')
+
+        emb = layers.Flatten()(layers.Embedding(self.capacity, embed_dim)(sat))
+        x = layers.Concatenate()([inputs, layers.RepeatVector(seq_length)(emb)])
+
+        x = layers.LSTM(64, return_sequences=True)(x)
+        x = layers.Dropout(0.2)(x)
+        x = layers.LSTM(32)(x)
+        x = layers.Dropout(0.2)(x)
+        x = layers.Concatenate()([x, emb])
+        x = layers.Dense(32, activation='relu')(x)
+        outputs = layers.Dense(output_steps)(x)
+
+        model = Model([inputs, sat], outputs)
+        model.compile(optimizer='adam', loss='mse', metrics=['mae'])
+        return model
+
+    def sat_ids(self, satellites):
+        return np.array([self.satellites.index(s) for s in satellites], dtype=np.int32)
+
+    def train(self, X, sat_ids, y, epochs=30, batch_size=32, val_split=0.15, seed=0):
+        # Validate on each satellite's last windows; a shuffled split would
+        # leak, since stride-1 windows overlap their neighbours almost entirely
+        train_idx, val_idx = split_windows(sat_ids, val_split)
+        # Windows are grouped by satellite; shuffle the training part once
+        # so batches mix satellites
+        train_idx = np.random.default_rng(seed).permutation(train_idx)
+
+        callbacks = [
+            tf.keras.callbacks.EarlyStopping(patience=10, restore_best_weights=True, verbose=0),
+            tf.keras.callbacks.ReduceLROnPlateau(patience=5, factor=0.5, verbose=0)
+        ]
+
+        val = None
+        if len(val_idx):
+            val = ([X[val_idx], sat_ids[val_idx, None]], y[val_idx])
+        return self.model.fit([X[train_idx], sat_ids[train_idx, None]], y[train_idx], epochs=epochs,
+                              batch_size=batch_size, validation_data=val, callbacks=callbacks, verbose=0)
+
+    def predict(self, X, sat_ids, batch_size=1024):
+        return self.model.predict([X, np.asarray(sat_ids, dtype=np.int32)[:, None]],
+                                  batch_size=batch_size, verbose=0)
+
+    def forecast(self, windows):
+        """One forward pass for the constellation: {satellite: (seq_length, n_features) window} -> {satellite: forecast}"""
+        names = list(windows)
+        X = np.stack([windows[s] for s in names]).astype(np.float32)
+        y = self.model([X, self.sat_ids(names)[:, None]], training=False).numpy()
+        return dict(zip(names, y))
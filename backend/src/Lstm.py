@@ -2,6 +2,8 @@ import numpy as np
 import tensorflow as tf
 from tensorflow.keras import layers, Model
 
+from .datasets import train_val_datasets
+
 class LSTMModel:
     """Simple LSTM for time series"""
     
@@ -34,5 +36,18 @@ class LSTMModel:
         return self.model.fit(X, y, epochs=epochs, batch_size=batch_size,
                             validation_split=val_split, callbacks=callbacks, verbose=0)
     
+    def train_stream(self, X, y, seq_length, n_future, epochs=30, batch_size=16, val_split=0.15):
+        """Train on windows generated on the fly from the scaled series (tf.data)"""
+        train_ds, val_ds = train_val_datasets(X, y, seq_length, n_future,
+                                              batch_size=batch_size, val_split=val_split)
+        
+        callbacks = [
+            tf.keras.callbacks.EarlyStopping(patience=10, restore_best_weights=True, verbose=0),
+            tf.keras.callbacks.ReduceLROnPlateau(patience=5, factor=0.5, verbose=0)
+        ]
+        
+        return self.model.fit(train_ds, validation_data=val_ds, epochs=epochs,
+                            callbacks=callbacks, verbose=0)
+    
     def predict(self, X):
         return self.model.predict(X, verbose=0)
\ No newline at end of file
@@ -1,4 +1,25 @@
-from .Lstm import LSTMModel
-from .Probablistic import ProbabilisticModel
-from .Transformer import TransformerModel
-from .preprocessing import load_and_preprocess, add_features, add_temporal_features, split_train_test, scale_data, create_sequences
\ No newline at end of file
+from importlib import import_module
+
+# The model classes pull in TensorFlow and preprocessing pulls in
+# scikit-learn; import them on first access so the NumPy-only modules
+# (rinex, ephemeris, residuals, instrument, ...) stay cheap to load in worker
+# processes and in the API server
+_LAZY = {
+    'ClockErrorModel': '.Clock',
+    'LSTMModel': '.Lstm',
+    'ProbabilisticModel': '.Probablistic',
+    'TransformerModel': '.Transformer',
+    'load_and_preprocess': '.preprocessing',
+    'add_features': '.preprocessing',
+    'add_temporal_features': '.preprocessing',
+    'split_train_test': '.preprocessing',
+    'scale_data': '.preprocessing',
+    'create_sequences': '.preprocessing',
+    'materialize': '.preprocessing',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        return getattr(import_module(_LAZY[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,154 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class Histogram:
+    """Fixed-bucket histogram; bucket i counts values <= bounds[i], the last one the rest"""
+
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.bounds) and value > self.bounds[i]:
+            i += 1
+        self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+    def to_dict(self):
+        labels = [f"<={b}" for b in self.bounds] + [f">{self.bounds[-1]}"]
+        return {
+            # list of pairs keeps bucket order through jsonify's key sorting
+            'buckets': [[label, n] for label, n in zip(labels, self.counts)],
+            'count': self.total,
+            'mean': round(self.sum / self.total, 4) if self.total else None,
+        }
+
+
+class _Request:
+    __slots__ = ('x', 'variant', 'future', 'enqueued')
+
+    def __init__(self, x, variant):
+        self.x = x
+        self.variant = variant
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent inference requests per key into one batched predict call.
+
+    `predict_fn(key, X, variant)` is called with the requests' inputs
+    concatenated along the batch axis. A batch is flushed when it reaches
+    `max_batch_size` rows or when the oldest request has waited `max_wait_ms`.
+
+    `variant` (e.g. a model version) shares the key's queue and worker but is
+    never mixed into another variant's forward pass, so keys stay bounded
+    while the variants behind them change.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=5):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queues = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, x, variant=None):
+        """Queue one request (x has a leading batch axis); returns a Future of its rows"""
+        req = _Request(np.asarray(x), variant)
+        self._queue(key).put(req)
+        return req.future
+
+    def predict(self, key, x, variant=None, timeout=None):
+        """Blocking submit"""
+        return self.submit(key, x, variant).result(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                '/'.join(map(str, key)) if isinstance(key, tuple) else str(key): {
+                    'batch_size': s['batch_size'].to_dict(),
+                    'queue_wait_ms': s['queue_wait_ms'].to_dict(),
+                }
+                for key, s in self._stats.items()
+            }
+
+    def _queue(self, key):
+        q = self._queues.get(key)
+        if q is None:
+            with self._lock:
+                q = self._queues.get(key)
+                if q is None:
+                    q = queue.Queue()
+                    self._queues[key] = q
+                    self._stats[key] = {
+                        'batch_size': Histogram([1, 2, 4, 8, 16, 32, 64, 128]),
+                        'queue_wait_ms': Histogram([0.5, 1, 2, 5, 10, 20, 50, 100]),
+                    }
+                    threading.Thread(target=self._worker, args=(key, q),
+                                     name=f"batcher-{key}", daemon=True).start()
+        return q
+
+    def _collect(self, q):
+        # Block for the first request, then fill up until size or deadline
+        batch = [q.get()]
+        rows = len(batch[0].x)
+        deadline = batch[0].enqueued + self.max_wait
+
+        while rows < self.max_batch_size:
+            # Past the deadline, still take whatever is already queued
+            remaining = deadline - time.perf_counter()
+            try:
+                req = q.get(timeout=remaining) if remaining > 0 else q.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(req)
+            rows += len(req.x)
+        return batch
+
+    def _worker(self, key, q):
+        stats = self._stats[key]
+        while True:
+            batch = self._collect(q)
+            start = time.perf_counter()
+
+            # One forward pass per variant, in arrival order
+            groups = {}
+            for r in batch:
+                groups.setdefault(r.variant, []).append(r)
+
+            with self._lock:
+                for group in groups.values():
+                    stats['batch_size'].observe(sum(len(r.x) for r in group))
+                for r in batch:
+                    stats['queue_wait_ms'].observe((start - r.enqueued) * 1000.0)
+
+            for variant, group in groups.items():
+                self._run(key, variant, group)
+
+    def _run(self, key, variant, batch):
+        try:
+            y = self.predict_fn(key, np.concatenate([r.x for r in batch]), variant)
+        except Exception as e:
+            for r in batch:
+                r.future.set_exception(e)
+            return
+
+        # Hand each request back its own rows
+        offset = 0
+        for r in batch:
+            n = len(r.x)
+            r.future.set_result(y[offset:offset + n])
+            offset += n
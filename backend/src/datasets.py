@@ -0,0 +1,57 @@
+import numpy as np
+import tensorflow as tf
+
+from .preprocessing import window_count
+
+
+# -------------------------------
+# Streaming tf.data windows
+# -------------------------------
+def window_dataset(X, y, seq_length, n_future, start, stop, batch_size=16, shuffle=False, seed=None):
+    """
+    tf.data pipeline yielding (X window, y future) batches for windows [start, stop).
+
+    Only the scaled series is held in memory (as float32); each batch is gathered
+    from it on the fly, so nothing scales with n_windows * seq_length.
+    """
+    X = tf.constant(np.asarray(X, dtype=np.float32))
+    y = tf.constant(np.asarray(y, dtype=np.float32).reshape(len(y), -1)[:, 0])
+
+    x_offsets = tf.range(seq_length, dtype=tf.int64)
+    y_offsets = tf.range(n_future, dtype=tf.int64) + seq_length
+
+    def gather(idx):
+        # idx: (batch,) window start positions
+        return (tf.gather(X, idx[:, None] + x_offsets),
+                tf.gather(y, idx[:, None] + y_offsets))
+
+    ds = tf.data.Dataset.range(start, stop)
+    if shuffle:
+        ds = ds.shuffle(stop - start, seed=seed, reshuffle_each_iteration=True)
+
+    # Batch the indices first so each gather is one vectorized op per batch
+    ds = ds.batch(batch_size).map(gather, num_parallel_calls=tf.data.AUTOTUNE)
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+
+def train_val_datasets(X, y, seq_length, n_future, batch_size=16, val_split=0.15, seed=None):
+    """
+    Split the windows of a scaled series into train / validation pipelines.
+
+    Mirrors Keras `validation_split`: the last `val_split` fraction of windows is
+    held out. The split is by window index, so no data is copied.
+    """
+    n_windows, n_future = window_count(len(X), seq_length, n_future)
+    if n_windows <= 0:
+        raise ValueError(f"Need at least {seq_length + 1} samples, got {len(X)}.")
+
+    n_train = int(n_windows * (1 - val_split))
+    train_ds = window_dataset(X, y, seq_length, n_future, 0, n_train,
+                              batch_size=batch_size, shuffle=True, seed=seed)
+
+    val_ds = None
+    if n_train < n_windows:
+        val_ds = window_dataset(X, y, seq_length, n_future, n_train, n_windows,
+                                batch_size=batch_size)
+
+    return train_ds, val_ds
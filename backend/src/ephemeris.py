@@ -0,0 +1,159 @@
+import numpy as np
+
+# IS-GPS-200 constants
+GM = 3.986005e14                 # m^3/s^2
+OMEGA_E = 7.2921151467e-5        # earth rotation rate, rad/s
+F_REL = -4.442807633e-10         # relativistic clock term, s/sqrt(m)
+C = 299792458.0                  # m/s
+SECONDS_PER_WEEK = 604800
+GPS_EPOCH = np.datetime64('1980-01-06T00:00:00', 'ms')
+
+KEPLER_ITERATIONS = 8
+
+
+def gps_seconds(t):
+    """Seconds since the GPS epoch for datetime64 (GPS time scale) input; numbers pass through"""
+    t = np.asarray(t)
+    if np.issubdtype(t.dtype, np.datetime64):
+        return (t.astype('datetime64[ms]') - GPS_EPOCH).astype(np.int64) / 1000.0
+    return t.astype(np.float64)
+
+
+def epoch_grid(start, end, step_seconds=900):
+    """Regular datetime64 grid [start, end) with the given step (900 s = 15 min)"""
+    start = np.datetime64(start, 'ms')
+    end = np.datetime64(end, 'ms')
+    return np.arange(start, end, np.timedelta64(int(step_seconds * 1000), 'ms'))
+
+
+def propagate(eph, t, iterations=KEPLER_ITERATIONS):
+    """
+    ECEF position (m) and SV clock bias (s) from broadcast ephemerides.
+
+    `eph` is a parsed navigation array (see src.rinex) or any mapping of the
+    orbit fields; its fields and `t` (datetime64 or GPS seconds) are broadcast
+    against each other, so eph[:, None] with t[None, :] gives a full
+    (records x epochs) grid in one pass. Kepler's equation is solved with a
+    fixed number of Newton iterations so every element takes the same path.
+
+    Returns (x, y, z, clock_bias).
+    """
+    t = gps_seconds(t)
+
+    sqrt_a = eph['sqrtA']
+    e = eph['Eccentricity']
+    toe = eph['GPSWeek'] * SECONDS_PER_WEEK + eph['Toe']
+    toc = gps_seconds(eph['time'])
+
+    # Week number is folded into toe, so no half-week crossover handling is needed
+    tk = t - toe
+
+    a = sqrt_a ** 2
+    n = np.sqrt(GM / a ** 3) + eph['DeltaN']
+    M = eph['M0'] + n * tk
+
+    # Kepler: E - e sin E = M
+    E = M
+    for _ in range(iterations):
+        E = E - (E - e * np.sin(E) - M) / (1.0 - e * np.cos(E))
+
+    sin_E, cos_E = np.sin(E), np.cos(E)
+    v = np.arctan2(np.sqrt(1.0 - e ** 2) * sin_E, cos_E - e)
+    phi = v + eph['omega']
+
+    sin_2phi, cos_2phi = np.sin(2 * phi), np.cos(2 * phi)
+    u = phi + eph['Cus'] * sin_2phi + eph['Cuc'] * cos_2phi
+    r = a * (1.0 - e * cos_E) + eph['Crs'] * sin_2phi + eph['Crc'] * cos_2phi
+    i = eph['Io'] + eph['Cis'] * sin_2phi + eph['Cic'] * cos_2phi + eph['IDOT'] * tk
+
+    x_orb = r * np.cos(u)
+    y_orb = r * np.sin(u)
+
+    omega = eph['Omega0'] + (eph['OmegaDot'] - OMEGA_E) * tk - OMEGA_E * eph['Toe']
+    sin_O, cos_O = np.sin(omega), np.cos(omega)
+    cos_i = np.cos(i)
+
+    x = x_orb * cos_O - y_orb * cos_i * sin_O
+    y = x_orb * sin_O + y_orb * cos_i * cos_O
+    z = y_orb * np.sin(i)
+
+    # SV clock: polynomial around Toc plus the relativistic eccentricity term
+    dt = t - toc
+    clock_bias = (eph['SVclockBias'] + eph['SVclockDrift'] * dt + eph['SVclockDriftRate'] * dt ** 2
+                  + F_REL * e * sqrt_a * sin_E)
+
+    return x, y, z, clock_bias
+
+
+def satellite_positions(eph, t, iterations=KEPLER_ITERATIONS):
+    """Positions / clock of every record at every epoch: (n_records, n_epochs) arrays"""
+    eph = np.asarray(eph)
+    return propagate(eph[:, np.newaxis], np.asarray(t)[np.newaxis, :], iterations)
+
+
+class EphemerisIndex:
+    """
+    Per-PRN sorted Toe index over ephemeris records from any number of files.
+
+    lookup() finds, for each (prn, t), the record whose Toe is closest to t
+    with a binary search over one sorted (prn, Toe) key array, and rejects
+    matches outside the record's fit interval. Queries are batched: prn and t
+    broadcast against each other, e.g. prns[:, None] with epochs[None, :].
+    """
+
+    # Keys are prn * _STRIDE + Toe (GPS seconds); GPS seconds stay well below 1e10
+    _STRIDE = 10 ** 10
+
+    def __init__(self, nav):
+        nav = np.asarray(nav)
+        toe = np.round(nav['GPSWeek'] * SECONDS_PER_WEEK + nav['Toe']).astype(np.int64)
+        order = np.lexsort((toe, nav['sv']))
+
+        self.nav = nav[order]
+        self.toe = toe[order]
+        self.keys = self.nav['sv'].astype(np.int64) * self._STRIDE + self.toe
+
+        # Fit interval in hours; 0 / missing means the default 4 h curve fit
+        fit_hours = np.where(self.nav['FitIntvl'] > 0, self.nav['FitIntvl'], 4.0)
+        self.half_fit = fit_hours * 3600.0 / 2.0
+
+    def __len__(self):
+        return len(self.nav)
+
+    @property
+    def prns(self):
+        return np.unique(self.nav['sv'])
+
+    def lookup(self, prn, t):
+        """Record index per (prn, t), or -1 where no record's fit interval covers t"""
+        prn = np.asarray(prn, dtype=np.int64)
+        t = gps_seconds(t)
+        prn, t = np.broadcast_arrays(prn, t)
+
+        if len(self.keys) == 0:
+            return np.full(prn.shape, -1, dtype=np.int64)
+
+        query = prn * self._STRIDE + t
+        right = np.searchsorted(self.keys, query).clip(0, len(self.keys) - 1)
+        left = (right - 1).clip(0)
+
+        # Closest of the two neighbours that belongs to the same PRN
+        d_left = np.where(self.nav['sv'][left] == prn, np.abs(t - self.toe[left]), np.inf)
+        d_right = np.where(self.nav['sv'][right] == prn, np.abs(t - self.toe[right]), np.inf)
+        idx = np.where(d_right < d_left, right, left)
+        dist = np.minimum(d_left, d_right)
+
+        return np.where(dist <= self.half_fit[idx], idx, -1)
+
+    def positions(self, prns, t, iterations=KEPLER_ITERATIONS):
+        """
+        x, y, z, clock_bias grids of shape (len(prns), len(t)) using the best
+        record per epoch; NaN where no valid record exists.
+        """
+        prns = np.asarray(prns)[:, np.newaxis]
+        t = np.asarray(t)[np.newaxis, :]
+
+        idx = self.lookup(prns, t)
+        valid = idx >= 0
+        out = propagate(self.nav[np.where(valid, idx, 0)], t, iterations)
+        return tuple(np.where(valid, v, np.nan) for v in out)
@@ -0,0 +1,37 @@
+import numpy as np
+
+# Older windows kept with an artifact and mixed into every fine-tune
+REPLAY_SIZE = 256
+
+
+def sample_replay(X, y, size=REPLAY_SIZE, seed=None):
+    """Uniform sample of at most `size` windows, as contiguous copies (keeps time order)"""
+    n = len(X)
+    if n <= size:
+        idx = np.arange(n)
+    else:
+        idx = np.sort(np.random.default_rng(seed).choice(n, size, replace=False))
+    return np.ascontiguousarray(X[idx]), np.ascontiguousarray(y[idx])
+
+
+def update_replay(replay, X_new, y_new, size=REPLAY_SIZE, seed=None):
+    """Replay buffer for the next fine-tune: a uniform sample of the old buffer plus the new windows"""
+    if replay is None:
+        return sample_replay(X_new, y_new, size, seed)
+    X = np.concatenate([replay[0], X_new])
+    y = np.concatenate([replay[1], y_new])
+    return sample_replay(X, y, size, seed)
+
+
+def finetune(model, X_new, y_new, replay=None, epochs=15, batch_size=8, **kwargs):
+    """
+    Continue training `model` (LSTMModel etc.) on new windows plus the replay
+    buffer, so it adapts without forgetting older days. The new windows go
+    last, so Keras' validation_split holds out the most recent ones.
+    """
+    if replay is not None and len(replay[0]):
+        X = np.concatenate([replay[0], X_new])
+        y = np.concatenate([replay[1], y_new])
+    else:
+        X, y = X_new, y_new
+    return model.train(X, y, epochs=epochs, batch_size=batch_size, **kwargs)
@@ -0,0 +1,242 @@
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+# Setting this (to a .jsonl path) turns tracing on, also in spawned workers
+TRACE_ENV = 'EPHEMRIS_TRACE'
+TRACE_RUN_ENV = 'EPHEMRIS_TRACE_RUN'
+
+_enabled = False
+_path = None
+_run = None
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def enable(path, run=None):
+    """Write spans as JSON lines to `path` (appending); child processes started afterwards inherit it"""
+    global _enabled, _path, _run
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    _path, _run, _enabled = path, run, True
+    os.environ[TRACE_ENV] = path
+    if run is not None:
+        os.environ[TRACE_RUN_ENV] = str(run)
+
+
+def disable():
+    global _enabled
+    _enabled = False
+    os.environ.pop(TRACE_ENV, None)
+    os.environ.pop(TRACE_RUN_ENV, None)
+
+
+def enabled():
+    return _enabled
+
+
+def trace_path():
+    return _path
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == 'darwin' else rss / 2**10
+
+
+def nbytes(obj):
+    """Total size of the arrays / DataFrames in a (nested) result"""
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if hasattr(obj, 'memory_usage') and hasattr(obj, 'columns'):
+        return int(obj.memory_usage(deep=False).sum())
+    if isinstance(obj, dict):
+        return sum(nbytes(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(nbytes(v) for v in obj)
+    return 0
+
+
+def _describe(value):
+    shape = getattr(value, 'shape', None)
+    if shape is None:
+        return None
+    return {'shape': list(shape), 'mb': round(nbytes(value) / 2**20, 4)}
+
+
+# -------------------------------
+# Spans
+# -------------------------------
+class Span:
+    """One timed region; use span() / traced() rather than creating these directly"""
+
+    __slots__ = ('name', 'attrs', 'parent', '_wall', '_cpu', '_rss')
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.parent = None
+
+    def set(self, **attrs):
+        """Attach attributes; arrays / DataFrames are recorded as their shape and size"""
+        for key, value in attrs.items():
+            described = _describe(value)
+            self.attrs[key] = described if described is not None else value
+        return self
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self._rss = peak_rss_mb()
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        rss = peak_rss_mb()
+        _local.stack.pop()
+
+        record = {
+            'span': self.name,
+            'parent': self.parent,
+            'run': _run,
+            'pid': os.getpid(),
+            'ts': round(time.time(), 3),
+            'wall_ms': round(wall * 1e3, 3),
+            # process-wide: includes TensorFlow / BLAS worker threads
+            'cpu_ms': round(cpu * 1e3, 3),
+            'rss_peak_mb': round(rss, 1),
+            'rss_growth_mb': round(rss - self._rss, 1),
+        }
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+        if self.attrs:
+            record['attrs'] = self.attrs
+        _emit(record)
+        return False
+
+
+class _NoSpan:
+    """Shared stand-in while tracing is off"""
+
+    def set(self, **attrs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name, **attrs):
+    """
+    Time a block: wall / CPU time and peak RSS, plus any attributes.
+
+        with span('train', model='LSTM') as s:
+            s.set(X=X_train)
+            model.train(...)
+
+    Returns a shared no-op object when tracing is off.
+    """
+    if not _enabled:
+        return _NO_SPAN
+    return Span(name, attrs)
+
+
+def traced(name=None, size=True):
+    """Decorator form of span(); records the size of the returned arrays unless size=False"""
+    def decorate(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Span(span_name, {}) as s:
+                out = fn(*args, **kwargs)
+                if size:
+                    s.attrs['out_mb'] = round(nbytes(out) / 2**20, 4)
+                return out
+        return wrapper
+    return decorate
+
+
+def _emit(record):
+    line = json.dumps(record, default=str) + '\n'
+    with _lock:
+        with open(_path, 'a') as f:
+            f.write(line)
+
+
+# -------------------------------
+# Reading traces back
+# -------------------------------
+def load(path, run=None):
+    """Span records from a trace file, optionally only one run's"""
+    records = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if run is None or record.get('run') == run:
+                    records.append(record)
+    return records
+
+
+def summarize(records):
+    """Per span name: calls, total / mean / max wall, total CPU, highest peak RSS (slowest total first)"""
+    groups = defaultdict(list)
+    for record in records:
+        groups[record['span']].append(record)
+
+    rows = []
+    for name, group in groups.items():
+        walls = [r['wall_ms'] for r in group]
+        rows.append({
+            'span': name,
+            'calls': len(group),
+            'wall_s': sum(walls) / 1e3,
+            'cpu_s': sum(r['cpu_ms'] for r in group) / 1e3,
+            'mean_ms': sum(walls) / len(walls),
+            'max_ms': max(walls),
+            'rss_peak_mb': max(r['rss_peak_mb'] for r in group),
+            'processes': len({r['pid'] for r in group}),
+        })
+    return sorted(rows, key=lambda r: -r['wall_s'])
+
+
+def summary_table(records):
+    lines = [f"  {'SPAN':<22} {'CALLS':>6} {'WALL s':>9} {'CPU s':>9} {'MEAN ms':>10} "
+             f"{'MAX ms':>10} {'PEAK RSS MB':>12} {'PROCS':>6}"]
+    for r in summarize(records):
+        lines.append(f"  {r['span']:<22} {r['calls']:>6} {r['wall_s']:>9.2f} {r['cpu_s']:>9.2f} "
+                     f"{r['mean_ms']:>10.1f} {r['max_ms']:>10.1f} {r['rss_peak_mb']:>12.1f} {r['processes']:>6}")
+    return '\n'.join(lines)
+
+
+# Picked up in spawned workers (orchestrator, plot stage) and from the shell
+if os.environ.get(TRACE_ENV):
+    enable(os.environ[TRACE_ENV], os.environ.get(TRACE_RUN_ENV))
+
+
+if __name__ == "__main__":
+    # Summary of a trace file: python -m src.instrument results/trace.jsonl [run_id]
+    path = sys.argv[1]
+    run = sys.argv[2] if len(sys.argv) > 2 else None
+    print(summary_table(load(path, run)))
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+from . import preprocessing
+
+TEMPORAL_COLS = ['is_weekend', 'hour_sin', 'hour_cos', 'day_sin', 'day_cos']
+
+
+class OnlineFeatureEngine:
+    """
+    Incremental version of preprocessing.add_features / add_temporal_features.
+
+    Keeps the last 6 radial errors in a ring buffer, so each new sample costs
+    O(1) instead of recomputing the lag / diff / rolling columns over the
+    whole frame. Like the batch version (which drops the NaN rows), no
+    features are produced until 6 samples have been seen.
+    """
+
+    WINDOW = 6
+
+    def __init__(self, temporal=False, keep=0):
+        self.temporal = temporal
+        self.columns = [preprocessing.TARGET_COL] + preprocessing.FEATURE_COLS
+        if temporal:
+            self.columns = self.columns + TEMPORAL_COLS
+
+        self._buf = np.zeros(self.WINDOW)
+        self._count = 0
+
+        # Optional ring buffer of the last `keep` feature rows (model input window)
+        self.keep = keep
+        self._rows = np.zeros((keep, len(self.columns)))
+        self._n_rows = 0
+
+    def reset(self):
+        self._count = 0
+        self._n_rows = 0
+
+    @property
+    def ready(self):
+        return self._count >= self.WINDOW
+
+    def update(self, value, timestamp=None):
+        """Add one radial error sample; returns its feature row (dict) or None while warming up"""
+        prev = self._buf[(self._count - 1) % self.WINDOW]
+        self._buf[self._count % self.WINDOW] = value
+        self._count += 1
+
+        if self._count < self.WINDOW:
+            return None
+
+        # Last 3 samples in arrival order, then the rest of the 6-sample window
+        i = self._count
+        last3 = self._buf[[(i - 3) % 6, (i - 2) % 6, (i - 1) % 6]]
+        row = {
+            preprocessing.TARGET_COL: value,
+            'radial_lag1': prev,
+            'radial_diff1': value - prev,
+            'radial_roll3': last3.sum() / 3,
+            'radial_roll6': (last3.sum() + self._buf[[i % 6, (i + 1) % 6, (i + 2) % 6]].sum()) / 6,
+        }
+
+        if self.temporal:
+            ts = pd.Timestamp(timestamp)
+            hour, dow = ts.hour, ts.dayofweek
+            row['is_weekend'] = int(dow >= 5)
+            row['hour_sin'] = np.sin(2 * np.pi * hour / 24)
+            row['hour_cos'] = np.cos(2 * np.pi * hour / 24)
+            row['day_sin'] = np.sin(2 * np.pi * dow / 7)
+            row['day_cos'] = np.cos(2 * np.pi * dow / 7)
+
+        if self.keep:
+            self._rows[self._n_rows % self.keep] = [row[c] for c in self.columns]
+            self._n_rows += 1
+        return row
+
+    def window(self, columns=None):
+        """Last `keep` feature rows, oldest first, as a (keep, n_columns) array"""
+        if self._n_rows < self.keep:
+            raise ValueError(f"Need {self.keep} feature rows, have {self._n_rows}.")
+        start = self._n_rows % self.keep
+        rows = np.roll(self._rows, -start, axis=0)
+        if columns is not None:
+            rows = rows[:, [self.columns.index(c) for c in columns]]
+        return rows
+
+    def replay(self, df):
+        """Feed a frame row by row and collect the feature rows (same index as the batch output)"""
+        values = df[preprocessing.TARGET_COL].to_numpy()
+        index = df.index
+        out, kept = [], []
+        for i, value in enumerate(values):
+            row = self.update(value, index[i] if self.temporal else None)
+            if row is not None:
+                out.append(row)
+                kept.append(index[i])
+        return pd.DataFrame(out, index=pd.Index(kept, name=index.name), columns=self.columns)
+
+
+def compare_with_batch(df, temporal=False):
+    """Max abs difference per column between OnlineFeatureEngine and the batch functions"""
+    batch = preprocessing.add_features(df.copy())
+    if temporal:
+        batch = preprocessing.add_temporal_features(batch)
+
+    online = OnlineFeatureEngine(temporal=temporal).replay(df)
+    if not batch.index.equals(online.index):
+        raise AssertionError("online and batch feature rows are not aligned")
+    return (batch[online.columns] - online).abs().max()
@@ -1,36 +1,122 @@
+import hashlib
+import os
+
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import RobustScaler
 
+from .instrument import traced
+
+# Columns the radial-error models are trained on
+FEATURE_COLS = ['radial_lag1', 'radial_diff1', 'radial_roll3', 'radial_roll6']
+TARGET_COL = 'radial_error_m'
+
+# Raw CSV layout
+TIME_COL = 'utc_time'
+TIME_FORMAT = '%m/%d/%Y %H:%M'
+VALUE_COLS = ['x_error (m)', 'y_error (m)', 'z_error (m)', 'satclockerror (m)']
+
+# Bump when the preprocessing below changes, so stale cache files are ignored
+CACHE_VERSION = 1
+
+
 # -------------------------------
 # 1️⃣ Load and preprocess
 # -------------------------------
-def load_and_preprocess(path):
-    # Load dataset, sort by utc_time, clean, and resample
-    df = pd.read_csv(path)
+def read_raw(path):
+    """Raw CSV with an explicitly parsed utc_time column and float32 error columns"""
+    df = pd.read_csv(path, dtype={c: np.float32 for c in VALUE_COLS})
+    df[TIME_COL] = pd.to_datetime(df[TIME_COL], format=TIME_FORMAT)
+    return df
 
-    # Ensure correct time column
-    df['utc_time'] = pd.to_datetime(df['utc_time'])
-    df = df.sort_values('utc_time')
-    df.set_index('utc_time', inplace=True)
 
-    # Resample every 15 minutes and interpolate missing values
-    df = df.resample('15 min').mean().interpolate()
+def resample_grid(times, values, step):
+    """
+    Mean of `values` per regular `step` bin, with empty bins linearly interpolated.
 
-    # Add radial error column
-    df['radial_error_m'] = np.sqrt(
-        df['x_error (m)']**2 + df['y_error (m)']**2 + df['z_error (m)']**2
-    )
+    Same result as df.resample(step).mean().interpolate() (bins anchored at
+    midnight of the first day, NaN before the first sample) but done with
+    bincount / np.interp on int64 nanoseconds. `times` needn't be sorted or
+    unique. Returns (grid times as datetime64[ns], (n_bins, n_cols) float32).
+    """
+    t = np.asarray(times, dtype='datetime64[ns]').astype(np.int64)
+    values = np.asarray(values, dtype=np.float64).reshape(len(t), -1)
+    step = pd.Timedelta(step).value
 
-    # Drop any leftover NaNs
-    df = df.dropna()
+    day = 86_400 * 10**9
+    first = t.min()
+    origin = first - first % day
+    start = first - (first - origin) % step
+    bins = (t - start) // step
+    n_bins = int(bins.max()) + 1
 
-    return df
+    grid = np.arange(n_bins)
+    out = np.full((n_bins, values.shape[1]), np.nan, dtype=np.float32)
+    for j in range(values.shape[1]):
+        ok = ~np.isnan(values[:, j])
+        counts = np.bincount(bins[ok], minlength=n_bins)
+        sums = np.bincount(bins[ok], weights=values[ok, j], minlength=n_bins)
+        have = counts > 0
+        if not have.any():
+            continue
+        col = np.interp(grid, grid[have], sums[have] / counts[have])
+        # interpolate() only fills forward: nothing before the first observation
+        col[:np.argmax(have)] = np.nan
+        out[:, j] = col
+
+    return (start + grid * step).astype('datetime64[ns]'), out
+
+
+def _cache_path(path, freq, cache_dir):
+    h = hashlib.sha1(f"v{CACHE_VERSION}/{pd.Timedelta(freq).value}/".encode())
+    with open(path, 'rb') as f:
+        h.update(f.read())
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{name}-{h.hexdigest()[:16]}.npz")
+
+
+@traced()
+def load_and_preprocess(path, freq='15 min', cache=True, cache_dir=None):
+    """
+    Load a dataset, resample it to `freq` and add the radial error column.
+
+    The preprocessed frame is cached as <data dir>/.cache/<name>-<hash>.npz,
+    keyed by the CSV's content and `freq`, so later runs skip CSV parsing.
+    Columns are float32.
+    """
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(path)), '.cache')
+    cache_path = _cache_path(path, freq, cache_dir) if cache else None
+
+    if cache_path and os.path.exists(cache_path):
+        with np.load(cache_path) as npz:
+            times, values = npz['times'], npz['values']
+    else:
+        raw = read_raw(path)
+        times, values = resample_grid(raw[TIME_COL].to_numpy(), raw[VALUE_COLS].to_numpy(), freq)
+
+        # Add radial error column
+        radial = np.sqrt((values[:, :3] ** 2).sum(axis=1, dtype=np.float32))
+        values = np.column_stack([values, radial]).astype(np.float32)
+
+        # Drop any leftover NaNs
+        keep = ~np.isnan(values).any(axis=1)
+        times, values = times[keep], values[keep]
+
+        if cache_path:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = cache_path + '.tmp'
+            with open(tmp, 'wb') as f:
+                np.savez(f, times=times, values=values)
+            os.replace(tmp, cache_path)
+
+    index = pd.DatetimeIndex(times, name=TIME_COL)
+    return pd.DataFrame(values, index=index, columns=VALUE_COLS + [TARGET_COL])
 
 
 # -------------------------------
 # 2️⃣ Feature Engineering
 # -------------------------------
+@traced()
 def add_features(df):
     # Add simple lag and rolling features
     df['radial_lag1'] = df['radial_error_m'].shift(1)
@@ -66,14 +152,13 @@ def add_temporal_features(df):
 def split_train_test(df):
     # Split a dataframe into train and test using n-1 / 1 day split.
     df = df.sort_index()
-    unique_days = df.index.normalize().unique()
+    days = df.index.normalize()
 
-    # Train: all but last day
-    train_days = unique_days[:-1]
-    test_day = unique_days[-1]
+    # Train: all but last day (sorted, so that's everything before it)
+    test_day = days[-1]
 
-    df_train = df[df.index.normalize().isin(train_days)]
-    df_test = df[df.index.normalize() == test_day]
+    df_train = df[days < test_day]
+    df_test = df[days == test_day]
 
     return df_train, df_test
 
@@ -95,44 +180,90 @@ def split_train_test_percentage(df, train_ratio=0.8):
 # -------------------------------
 # 4️⃣ Scaling
 # -------------------------------
-def scale_data(df_train, df_test, feature_cols, target_col):
-    """Scale features and target using RobustScaler."""
-    feature_scaler = RobustScaler()
-    target_scaler = RobustScaler()
+@traced()
+def scale_data(df_train, df_test, feature_cols, target_col, scaler=RobustScaler, fitted=None):
+    """
+    Scale features and target, fitting on train only (RobustScaler unless `scaler` is given).
+    Pass fitted=(feature_scaler, target_scaler) to reuse existing scalers as-is.
+    """
+    if fitted is None:
+        feature_scaler = scaler().fit(df_train[feature_cols])
+        target_scaler = scaler().fit(df_train[[target_col]])
+    else:
+        feature_scaler, target_scaler = fitted
 
-    X_train_scaled = feature_scaler.fit_transform(df_train[feature_cols])
+    X_train_scaled = feature_scaler.transform(df_train[feature_cols])
     X_test_scaled = feature_scaler.transform(df_test[feature_cols])
 
-    y_train_scaled = target_scaler.fit_transform(df_train[[target_col]])
+    y_train_scaled = target_scaler.transform(df_train[[target_col]])
     y_test_scaled = target_scaler.transform(df_test[[target_col]])
 
     return X_train_scaled, X_test_scaled, y_train_scaled, y_test_scaled, feature_scaler, target_scaler
 
 
+def window_lengths(dataset_name, step_minutes=15):
+    """(seq_length, n_future) in samples for a dataset: 8h/4h for MEO2, 12h/12h otherwise."""
+    if dataset_name == "MEO2":
+        seq_length_hr = 8
+        n_future_hr = 4
+    else:
+        seq_length_hr = 12
+        n_future_hr = 12
+
+    seq_length = int((seq_length_hr * 60) / step_minutes)
+    n_future = int((n_future_hr * 60) / step_minutes)
+    return seq_length, n_future
+
+
 # -------------------------------
-# 5️⃣ Sequence Creator - FIXED
+# 5️⃣ Sequence Creator - strided windows
 # -------------------------------
-def create_sequences(X, y, seq_length=48, n_future=48):
-    # Create sequences for LSTM.
-    Xs, ys = [], []
+def window_view(a, length):
+    """Read-only (n_windows, length, ...) view over consecutive rows of `a`, no copy."""
+    windows = np.lib.stride_tricks.sliding_window_view(a, length, axis=0)
+    # sliding_window_view puts the window axis last; move it next to the batch axis
+    return np.moveaxis(windows, -1, 1)
+
 
+def window_count(n_samples, seq_length, n_future):
+    """Number of (input, target) windows in a series, shortening n_future on short data."""
     # Check if enough data
     min_required = seq_length + n_future
-    if len(X) < min_required:
-        n_future = max(1, len(X) - seq_length - 1)
-        if n_future <= 0:
-            print(f"Need at least {seq_length + 1} samples, got {len(X)}.")
-            return np.empty((0, seq_length, X.shape[1])), np.empty((0, 1))
-
-    # Create sequences
-    for i in range(len(X) - seq_length - n_future + 1):
-        # Input sequence
-        Xs.append(X[i:i + seq_length])
-        
-        target_seq = y[i + seq_length:i + seq_length + n_future]
-        ys.append(target_seq.flatten())  
-    
-    Xs = np.array(Xs)
-    ys = np.array(ys)
-    
+    if n_samples < min_required:
+        n_future = max(1, n_samples - seq_length - 1)
+    return max(0, n_samples - seq_length - n_future + 1), n_future
+
+
+@traced()
+def create_sequences(X, y, seq_length=48, n_future=48, copy=False):
+    """
+    Create (input window, future target) pairs for the sequence models.
+
+    Windows are strided views into X and y, so memory stays O(N) instead of
+    O(N * seq_length). Pass copy=True (or use `materialize`) when a contiguous
+    array is needed.
+    """
+    n_windows, n_future = window_count(len(X), seq_length, n_future)
+    if n_windows <= 0:
+        print(f"Need at least {seq_length + 1} samples, got {len(X)}.")
+        return np.empty((0, seq_length, X.shape[1])), np.empty((0, n_future))
+
+    Xs = window_view(X, seq_length)[:n_windows]
+
+    y = np.asarray(y)
+    y_future = y[seq_length:]
+    if y.ndim == 1 or y.shape[1] == 1:
+        # Single target column: (n_windows, n_future) view
+        ys = window_view(y_future.reshape(len(y_future)), n_future)[:n_windows]
+    else:
+        # Multi-column targets are flattened per window like before (this copies)
+        ys = window_view(y_future, n_future)[:n_windows].reshape(n_windows, -1)
+
+    if copy:
+        return np.ascontiguousarray(Xs), np.ascontiguousarray(ys)
     return Xs, ys
+
+
+def materialize(windows, start=0, stop=None):
+    """Copy a batch of windows [start:stop] into a contiguous, writable array."""
+    return np.ascontiguousarray(windows[start:stop])
@@ -0,0 +1,218 @@
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import numpy as np
+import tensorflow as tf
+
+from .Clock import ClockErrorModel
+from .Lstm import LSTMModel
+from .Probablistic import ProbabilisticModel
+from .Transformer import TransformerModel
+
+MODEL_CLASSES = {
+    'lstm': LSTMModel,
+    'transformer': TransformerModel,
+    'probabilistic': ProbabilisticModel,
+    'clock': ClockErrorModel,
+}
+
+
+def load_keras_model(path, model_name, input_shape, output_steps):
+    """Load a saved .h5, rebuilding the architecture when the graph can't be deserialized"""
+    try:
+        return tf.keras.models.load_model(path, compile=False)
+    except Exception:
+        # Graphs with raw TF ops (Transformer positional encoding) don't
+        # deserialize; rebuild the architecture and load the weights instead
+        model = MODEL_CLASSES[model_name](input_shape=input_shape, output_steps=output_steps).model
+        model.load_weights(path)
+        return model
+
+
+class Artifact:
+    """A trained model with the scalers and window config it needs for inference"""
+
+    def __init__(self, model, feature_scaler, target_scaler, meta):
+        self.model = model
+        self.feature_scaler = feature_scaler
+        self.target_scaler = target_scaler
+        self.meta = meta
+        # Derived per-artifact objects (e.g. compiled forecasters), dropped with it
+        self.runtime = {}
+
+    @property
+    def key(self):
+        return (self.meta['model'], self.meta['dataset'], self.meta['version'])
+
+    @property
+    def feature_cols(self):
+        return self.meta['feature_cols']
+
+    @property
+    def target_col(self):
+        return self.meta['target_col']
+
+    @property
+    def seq_length(self):
+        return self.meta['seq_length']
+
+    @property
+    def n_future(self):
+        return self.meta['n_future']
+
+
+class ArtifactRegistry:
+    """
+    Versioned on-disk store of trained models.
+
+    Layout: <root>/<model>_<dataset>/v0001/{model.h5, scalers.pkl, meta.json}
+    plus an optional replay.npz of training windows kept for fine-tuning.
+    Artifacts are loaded on first use and at most `max_loaded` are kept in
+    memory; the least recently used one is evicted first.
+    """
+
+    def __init__(self, root, max_loaded=8):
+        self.root = root
+        self.max_loaded = max_loaded
+        self._loaded = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _dir(self, model_name, dataset, version=None):
+        path = os.path.join(self.root, f"{model_name.lower()}_{dataset.upper()}")
+        if version is not None:
+            path = os.path.join(path, f"v{version:04d}")
+        return path
+
+    def versions(self, model_name, dataset):
+        path = self._dir(model_name, dataset)
+        if not os.path.isdir(path):
+            return []
+        return sorted(int(d[1:]) for d in os.listdir(path)
+                      if d.startswith('v') and os.path.exists(os.path.join(path, d, 'meta.json')))
+
+    def latest(self, model_name, dataset):
+        path = self._dir(model_name, dataset)
+        if not os.path.isdir(path):
+            return None
+        # Newest complete version; cheap enough to check on every lookup
+        for d in sorted(os.listdir(path), reverse=True):
+            if d.startswith('v') and os.path.exists(os.path.join(path, d, 'meta.json')):
+                return int(d[1:])
+        return None
+
+    def _resolve(self, model_name, dataset, version):
+        if version is None:
+            version = self.latest(model_name, dataset)
+            if version is None:
+                raise KeyError(f"No artifact for {model_name.lower()}_{dataset.upper()}")
+        return version
+
+    def meta(self, model_name, dataset, version=None):
+        """Artifact metadata without loading the model"""
+        version = self._resolve(model_name, dataset, version)
+        with open(os.path.join(self._dir(model_name, dataset, version), 'meta.json')) as f:
+            return json.load(f)
+
+    def save(self, model_name, dataset, model, feature_scaler, target_scaler,
+             feature_cols, target_col, seq_length, n_future, replay=None, **extra):
+        """Write a new version and return its number; `replay` is an optional (X, y) window sample"""
+        model_name, dataset = model_name.lower(), dataset.upper()
+        version = (self.latest(model_name, dataset) or 0) + 1
+
+        # Another process may be saving the same key; take the next free version
+        while True:
+            path = self._dir(model_name, dataset, version)
+            try:
+                os.makedirs(path)
+                break
+            except FileExistsError:
+                version += 1
+
+        keras_model = getattr(model, 'model', model)
+        keras_model.save(os.path.join(path, 'model.h5'))
+
+        with open(os.path.join(path, 'scalers.pkl'), 'wb') as f:
+            pickle.dump({'feature': feature_scaler, 'target': target_scaler}, f)
+
+        if replay is not None:
+            np.savez(os.path.join(path, 'replay.npz'), X=replay[0], y=replay[1])
+
+        meta = {
+            'model': model_name,
+            'dataset': dataset,
+            'version': version,
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'feature_cols': list(feature_cols),
+            'target_col': target_col,
+            'seq_length': int(seq_length),
+            'n_future': int(n_future),
+            **extra,
+        }
+        # meta.json last: a version only counts once it is complete
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+        return version
+
+    def replay(self, model_name, dataset, version=None):
+        """(X, y) replay windows stored with a version, or None"""
+        version = self._resolve(model_name, dataset, version)
+        path = os.path.join(self._dir(model_name, dataset, version), 'replay.npz')
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as npz:
+            return npz['X'], npz['y']
+
+    def load(self, model_name, dataset, version=None):
+        """Artifact for (model, dataset), latest version by default; cached LRU"""
+        model_name, dataset = model_name.lower(), dataset.upper()
+        version = self._resolve(model_name, dataset, version)
+        key = (model_name, dataset, version)
+
+        artifact = self.cached(key)
+        if artifact is not None:
+            return artifact
+
+        # Read outside the lock so a cold load doesn't stall lookups of warm artifacts
+        artifact = self._read(model_name, dataset, version)
+        with self._lock:
+            loaded = self._loaded.get(key)
+            if loaded is not None:
+                # Another thread read it meanwhile; keep the one already handed out
+                self._loaded.move_to_end(key)
+                return loaded
+            self.cache_artifact(artifact)
+        return artifact
+
+    def cache_artifact(self, artifact):
+        """Put an artifact in the LRU (also used for ones built outside the registry)"""
+        with self._lock:
+            self._loaded[artifact.key] = artifact
+            self._loaded.move_to_end(artifact.key)
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+
+    def cached(self, key):
+        with self._lock:
+            artifact = self._loaded.get(key)
+            if artifact is not None:
+                self._loaded.move_to_end(key)
+            return artifact
+
+    def _read(self, model_name, dataset, version):
+        path = self._dir(model_name, dataset, version)
+        meta = self.meta(model_name, dataset, version)
+
+        with open(os.path.join(path, 'scalers.pkl'), 'rb') as f:
+            scalers = pickle.load(f)
+
+        model = load_keras_model(
+            os.path.join(path, 'model.h5'), model_name,
+            input_shape=(meta['seq_length'], len(meta['feature_cols'])),
+            output_steps=meta['n_future']
+        )
+        return Artifact(model, scalers['feature'], scalers['target'], meta)
@@ -0,0 +1,170 @@
+import numpy as np
+
+# Shapiro-Wilk p-values are only accurate up to 5000 samples
+NORMALITY_SAMPLE = 5000
+
+
+class ResidualStats:
+    """
+    Streaming residual moments per horizon step.
+
+    Keeps count, mean and central moment sums M2..M4 for each step and
+    combines batches with the pairwise update of Chan / Pébay, so stats from
+    folds, satellites or nightly runs can be merged without the residuals.
+    A stratified sample (same rows for every step, each batch represented in
+    proportion to its size) is kept alongside for normality tests and plots.
+    """
+
+    def __init__(self, n_steps=1, sample_size=NORMALITY_SAMPLE, seed=None):
+        self.n_steps = n_steps
+        self.max_rows = max(1, sample_size // n_steps)
+        self._rng = np.random.default_rng(seed)
+
+        self.n = np.zeros(n_steps)
+        self.mean = np.zeros(n_steps)
+        self.M2 = np.zeros(n_steps)
+        self.M3 = np.zeros(n_steps)
+        self.M4 = np.zeros(n_steps)
+        self.min = np.full(n_steps, np.inf)
+        self.max = np.full(n_steps, -np.inf)
+        self.sample = np.empty((0, n_steps))
+
+    @classmethod
+    def from_residuals(cls, residuals, n_steps=None, **kwargs):
+        residuals = np.asarray(residuals, dtype=np.float64)
+        n_steps = n_steps or (residuals.shape[1] if residuals.ndim == 2 else 1)
+        stats = cls(n_steps, **kwargs)
+        stats.update(residuals)
+        return stats
+
+    # -------------------------------
+    # Accumulation
+    # -------------------------------
+    def update(self, residuals):
+        """Add a (n_windows, n_steps) batch (1-D when n_steps == 1); NaN / inf are skipped"""
+        r = np.asarray(residuals, dtype=np.float64).reshape(-1, self.n_steps)
+        finite = np.isfinite(r)
+        if not finite.any():
+            return self
+
+        batch = ResidualStats(self.n_steps)
+        if finite.all():
+            batch.n = np.full(self.n_steps, float(len(r)))
+            batch.mean = r.mean(axis=0)
+            d = r - batch.mean
+            batch.min, batch.max = r.min(axis=0), r.max(axis=0)
+            batch.sample = r
+        else:
+            batch.n = finite.sum(axis=0).astype(np.float64)
+            batch.mean = np.where(finite, r, 0.0).sum(axis=0) / np.maximum(batch.n, 1)
+            d = np.where(finite, r - batch.mean, 0.0)
+            batch.min = np.where(finite, r, np.inf).min(axis=0)
+            batch.max = np.where(finite, r, -np.inf).max(axis=0)
+            batch.sample = r[finite.all(axis=1)]
+
+        d2 = d * d
+        batch.M2 = d2.sum(axis=0)
+        batch.M3 = np.einsum('ij,ij->j', d2, d)
+        batch.M4 = np.einsum('ij,ij->j', d2, d2)
+        return self.merge(batch)
+
+    def merge(self, other):
+        """Fold another ResidualStats (same horizon) into this one"""
+        if other.n_steps != self.n_steps:
+            raise ValueError(f"Can't merge {other.n_steps}-step stats into {self.n_steps}-step stats")
+
+        na, nb = self.n, other.n
+        n = na + nb
+        safe_n = np.where(n > 0, n, 1)
+        delta = other.mean - self.mean
+
+        mean = self.mean + delta * nb / safe_n
+        M2 = self.M2 + other.M2 + delta**2 * na * nb / safe_n
+        M3 = (self.M3 + other.M3 + delta**3 * na * nb * (na - nb) / safe_n**2
+              + 3 * delta * (na * other.M2 - nb * self.M2) / safe_n)
+        M4 = (self.M4 + other.M4 + delta**4 * na * nb * (na**2 - na * nb + nb**2) / safe_n**3
+              + 6 * delta**2 * (na**2 * other.M2 + nb**2 * self.M2) / safe_n**2
+              + 4 * delta * (na * other.M3 - nb * self.M3) / safe_n)
+
+        self.sample = self._merge_samples(self.sample, na.max(), other.sample, nb.max())
+        self.n, self.mean, self.M2, self.M3, self.M4 = n, mean, M2, M3, M4
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        return self
+
+    def _merge_samples(self, a, na, b, nb):
+        # Each side keeps rows in proportion to how many residuals it stands for
+        if len(a) + len(b) <= self.max_rows:
+            return np.concatenate([a, b])
+        k_a = int(round(self.max_rows * na / (na + nb))) if na + nb else 0
+        k_a = min(k_a, len(a))
+        k_b = min(self.max_rows - k_a, len(b))
+        pick = lambda s, k: s[np.sort(self._rng.choice(len(s), k, replace=False))]
+        return np.concatenate([pick(a, k_a), pick(b, k_b)])
+
+    def pooled(self):
+        """All horizon steps merged into one single-step ResidualStats"""
+        total = ResidualStats(1, sample_size=self.max_rows * self.n_steps)
+        for i in range(self.n_steps):
+            step = ResidualStats(1)
+            step.n, step.mean = self.n[i:i + 1], self.mean[i:i + 1]
+            step.M2, step.M3, step.M4 = self.M2[i:i + 1], self.M3[i:i + 1], self.M4[i:i + 1]
+            step.min, step.max = self.min[i:i + 1], self.max[i:i + 1]
+            total.merge(step)
+        total.sample = self.sample.reshape(-1, 1)
+        return total
+
+    # -------------------------------
+    # Statistics (population / biased, like np.std and scipy.stats defaults)
+    # -------------------------------
+    @property
+    def count(self):
+        return self.n
+
+    @property
+    def var(self):
+        return self.M2 / np.maximum(self.n, 1)
+
+    @property
+    def std(self):
+        return np.sqrt(self.var)
+
+    @property
+    def skew(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.sqrt(self.n) * self.M3 / self.M2**1.5
+
+    @property
+    def kurtosis(self):
+        """Excess (Fisher) kurtosis"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.n * self.M4 / self.M2**2 - 3.0
+
+    @property
+    def rmse(self):
+        return np.sqrt(self.var + self.mean**2)
+
+    def normality_sample(self):
+        return self.sample.ravel()
+
+    def shapiro(self):
+        """Shapiro-Wilk (W, p) on the stratified sample of all steps"""
+        from scipy import stats
+
+        sample = self.normality_sample()
+        if len(sample) < 3:
+            return np.nan, np.nan
+        return stats.shapiro(sample)
+
+    def to_dict(self):
+        as_list = lambda a: [None if not np.isfinite(v) else round(float(v), 6) for v in a]
+        return {
+            'count': [int(v) for v in self.n],
+            'mean': as_list(self.mean),
+            'std': as_list(self.std),
+            'rmse': as_list(self.rmse),
+            'skew': as_list(self.skew),
+            'kurtosis': as_list(self.kurtosis),
+            'min': as_list(self.min),
+            'max': as_list(self.max),
+        }
@@ -0,0 +1,246 @@
+import glob
+import gzip
+import hashlib
+import json
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Broadcast orbit parameters of a RINEX 2 GPS navigation record, in file order
+# (same names / order as georinex, i.e. the columns of output.csv)
+NAV_FIELDS = [
+    'SVclockBias', 'SVclockDrift', 'SVclockDriftRate',
+    'IODE', 'Crs', 'DeltaN', 'M0',
+    'Cuc', 'Eccentricity', 'Cus', 'sqrtA',
+    'Toe', 'Cic', 'Omega0', 'Cis',
+    'Io', 'Crc', 'omega', 'OmegaDot',
+    'IDOT', 'CodesL2', 'GPSWeek', 'L2Pflag',
+    'SVacc', 'health', 'TGD', 'IODC',
+    'TransTime', 'FitIntvl',
+]
+
+NAV_DTYPE = np.dtype([('sv', 'i2'), ('time', 'datetime64[ms]')] + [(f, 'f8') for f in NAV_FIELDS])
+
+LINES_PER_RECORD = 8
+LINE_WIDTH = 80
+FIELD_WIDTH = 19
+
+# (line, start column) of each field in a record: 3 on the epoch line, 4 per
+# orbit line, 2 on the last one
+_FIELD_POS = [(0, 22), (0, 41), (0, 60)]
+_FIELD_POS += [(line, col) for line in range(1, 7) for col in (3, 22, 41, 60)]
+_FIELD_POS += [(7, 3), (7, 22)]
+
+
+def read_bytes(path):
+    """File contents as a buffer: memory-mapped when plain text, decompressed when gzipped"""
+    with open(path, 'rb') as f:
+        if f.read(2) == b'\x1f\x8b':
+            f.seek(0)
+            return gzip.decompress(f.read())
+        f.seek(0)
+        if f.seek(0, 2) == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _line_grid(body):
+    """Pad every line of `body` into a (n_lines, 80) uint8 grid of ASCII codes"""
+    raw = np.frombuffer(body, dtype=np.uint8)
+    newlines = np.flatnonzero(raw == ord('\n'))
+    starts = np.concatenate([[0], newlines + 1])
+    ends = np.concatenate([newlines, [len(raw)]])
+
+    # drop the empty tail after the final newline
+    if starts[-1] >= len(raw):
+        starts, ends = starts[:-1], ends[:-1]
+
+    lengths = np.minimum(ends - starts, LINE_WIDTH)
+    cols = np.arange(LINE_WIDTH)
+    mask = cols < lengths[:, None]
+
+    grid = np.full((len(starts), LINE_WIDTH), ord(' '), dtype=np.uint8)
+    grid[mask] = raw[(starts[:, None] + cols)[mask]]
+    grid[grid == ord('\r')] = ord(' ')
+    return grid
+
+
+def _to_float(fields):
+    """(..., width) uint8 ASCII fields -> float64; blank fields are 0"""
+    shape = fields.shape[:-1]
+    fields = np.ascontiguousarray(fields).reshape(-1, fields.shape[-1])
+    blank = (fields == ord(' ')).all(axis=1)
+    fields[blank, -1] = ord('0')
+    as_str = fields.view(f'S{fields.shape[-1]}').ravel()
+    return as_str.astype(np.float64).reshape(shape)
+
+
+def parse_nav(source):
+    """
+    Parse a RINEX 2 GPS navigation file (plain or gzipped) in bulk.
+
+    Every record line is padded into one fixed-width byte grid, 'D' exponents
+    are rewritten to 'E' in place and all 19-character fields are decoded in a
+    single NumPy conversion. Returns a structured array (NAV_DTYPE), one row
+    per ephemeris record, with `sv` (PRN), `time` (Toc) and NAV_FIELDS.
+    """
+    buf = read_bytes(source) if isinstance(source, str) else source
+
+    header_end = buf.find(b'END OF HEADER')
+    if header_end < 0:
+        raise ValueError("Not a RINEX file: END OF HEADER not found")
+    body_start = buf.find(b'\n', header_end) + 1
+    if body_start == 0:
+        return np.empty(0, dtype=NAV_DTYPE)
+
+    grid = _line_grid(buf[body_start:])
+    # skip blank lines (trailing padding in some files)
+    grid = grid[(grid != ord(' ')).any(axis=1)]
+
+    n_records = len(grid) // LINES_PER_RECORD
+    if len(grid) % LINES_PER_RECORD:
+        print(f"Warning: ignoring {len(grid) % LINES_PER_RECORD} trailing lines of an incomplete record")
+    records = grid[:n_records * LINES_PER_RECORD].reshape(n_records, LINES_PER_RECORD, LINE_WIDTH)
+
+    # Fortran 'D' exponents -> 'E'
+    records[(records == ord('D')) | (records == ord('d'))] = ord('E')
+
+    lines = np.array([p[0] for p in _FIELD_POS])
+    cols = np.array([p[1] for p in _FIELD_POS])[:, None] + np.arange(FIELD_WIDTH)
+    values = _to_float(records[:, lines[:, None], cols])   # (n_records, 29)
+
+    # Epoch line: PRN yy mm dd hh mi ss.s
+    epoch = records[:, 0, :22]
+    sv = _to_float(epoch[:, 0:2]).astype(np.int16)
+    yy, mon, day, hour, minute = (_to_float(epoch[:, c:c + 2]).astype(np.int64) for c in (3, 6, 9, 12, 15))
+    sec = _to_float(epoch[:, 17:22])
+    year = np.where(yy < 80, 2000 + yy, 1900 + yy)
+
+    months = ((year - 1970) * 12 + (mon - 1)).astype('datetime64[M]')
+    time = (months.astype('datetime64[D]') + (day - 1)).astype('datetime64[ms]')
+    time = time + (hour * 3_600_000 + minute * 60_000 + np.round(sec * 1000).astype(np.int64))
+
+    nav = np.empty(n_records, dtype=NAV_DTYPE)
+    nav['sv'] = sv
+    nav['time'] = time
+    for i, name in enumerate(NAV_FIELDS):
+        nav[name] = values[:, i]
+    return nav
+
+
+def parse_nav_files(paths):
+    """Parse several navigation files into one array sorted by (sv, time)"""
+    parts = [parse_nav(p) for p in paths]
+    nav = np.concatenate(parts) if parts else np.empty(0, dtype=NAV_DTYPE)
+    return nav[np.lexsort((nav['time'], nav['sv']))]
+
+
+def by_prn(nav):
+    """Split records into {prn: records sorted by time}"""
+    nav = nav[np.lexsort((nav['time'], nav['sv']))]
+    prns, starts = np.unique(nav['sv'], return_index=True)
+    return {int(p): part for p, part in zip(prns, np.split(nav, starts[1:]))}
+
+
+def to_dataframe(nav):
+    """Records as a DataFrame with sv / time columns followed by NAV_FIELDS"""
+    return pd.DataFrame({name: nav[name] for name in NAV_DTYPE.names})
+
+
+# -------------------------------
+# Multi-day ingest with parsed cache
+# -------------------------------
+NAV_PATTERNS = ('brdc*.??n', 'brdc*.??n.gz', 'brdc*.??n.txt')
+
+
+def nav_files(directory):
+    """Daily broadcast navigation files in a directory, sorted by name"""
+    paths = set()
+    for pattern in NAV_PATTERNS:
+        paths.update(glob.glob(os.path.join(directory, pattern)))
+    return sorted(paths)
+
+
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def dedupe_records(nav):
+    """Drop repeated broadcasts (same sv, week, Toe, IODE) and sort by (sv, time)"""
+    if len(nav) == 0:
+        return nav
+    order = np.lexsort((nav['time'], nav['IODE'], nav['Toe'], nav['GPSWeek'], nav['sv']))
+    nav = nav[order]
+    key = np.stack([nav['sv'], nav['GPSWeek'], nav['Toe'], nav['IODE']], axis=1)
+    keep = np.concatenate([[True], (key[1:] != key[:-1]).any(axis=1)])
+    nav = nav[keep]
+    return nav[np.lexsort((nav['time'], nav['sv']))]
+
+
+def _parse_to_cache(path, cache_path):
+    nav = parse_nav(path)
+    tmp = cache_path + '.tmp.npy'
+    np.save(tmp, nav)
+    os.replace(tmp, cache_path)
+    return len(nav)
+
+
+def ingest_directory(directory, cache_dir=None, workers=None):
+    """
+    Parse every navigation file in `directory` at most once and merge them.
+
+    Parsed records are cached as <cache_dir>/<sha1 of file>.npy, so later runs
+    only parse new or changed files (in a process pool). A manifest of
+    (size, mtime) -> sha1 avoids re-hashing files that haven't changed. Records
+    repeated across day boundaries or file copies are deduplicated by IODE.
+    """
+    cache_dir = cache_dir or os.path.join(directory, '.cache')
+    os.makedirs(cache_dir, exist_ok=True)
+
+    manifest_path = os.path.join(cache_dir, 'manifest.json')
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    digests = {}
+    for path in nav_files(directory):
+        st = os.stat(path)
+        name = os.path.basename(path)
+        known = manifest.get(name)
+        if known and known['size'] == st.st_size and known['mtime_ns'] == st.st_mtime_ns:
+            digests[path] = known['sha1']
+        else:
+            digests[path] = file_digest(path)
+            manifest[name] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha1': digests[path]}
+
+    cache_paths = {d: os.path.join(cache_dir, d + '.npy') for d in set(digests.values())}
+    todo = {}
+    for path, digest in digests.items():
+        if not os.path.exists(cache_paths[digest]) and digest not in todo:
+            todo[digest] = path
+
+    if todo:
+        print(f"Parsing {len(todo)} of {len(digests)} navigation files")
+        if len(todo) == 1 or workers == 1:
+            for digest, path in todo.items():
+                _parse_to_cache(path, cache_paths[digest])
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(_parse_to_cache, todo.values(), [cache_paths[d] for d in todo]))
+
+    tmp = manifest_path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, manifest_path)
+
+    parts = [np.load(cache_paths[d]) for d in sorted(set(digests.values()))]
+    nav = np.concatenate(parts) if parts else np.empty(0, dtype=NAV_DTYPE)
+    return dedupe_records(nav)
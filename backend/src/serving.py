@@ -0,0 +1,293 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+
+from . import preprocessing
+from .batching import MicroBatcher
+from .Clock import add_clock_features
+from .online_features import OnlineFeatureEngine
+from .registry import MODEL_CLASSES, Artifact, ArtifactRegistry, load_keras_model
+
+# Training data per dataset, used to rebuild scalers for pre-registry models
+DATASET_FILES = {
+    'GEO': 'DATA_GEO_Train.csv',
+    'MEO1': 'DATA_MEO_Train.csv',
+    'MEO2': 'DATA_MEO_Train2.csv',
+}
+
+STEP = pd.Timedelta(minutes=15)
+
+# Numeric fields a history record may carry
+HISTORY_COLS = (preprocessing.TARGET_COL, *preprocessing.VALUE_COLS)
+
+# Models that also exist as pre-registry models/<model>_<dataset>.h5 files
+LEGACY_MODELS = ('lstm', 'transformer', 'probabilistic')
+
+
+class ForecastModel:
+    """An artifact's model compiled for inference, plus its feature / scaling steps"""
+
+    def __init__(self, artifact):
+        self.artifact = artifact
+        self.feature_cols = artifact.feature_cols
+        self.target_col = artifact.target_col
+        self.seq_length = artifact.seq_length
+        self.n_future = artifact.n_future
+        self.n_features = len(self.feature_cols)
+        self.target = artifact.meta.get('target', 'radial')
+        self.step = pd.Timedelta(artifact.meta.get('freq', STEP))
+
+        model = artifact.model
+        spec = tf.TensorSpec((None, self.seq_length, self.n_features), tf.float32)
+        self._forward = tf.function(lambda x: model(x, training=False), input_signature=[spec])
+
+        # Trace once up front so the first request doesn't pay for it
+        self.run(np.zeros((1, self.seq_length, self.n_features), dtype=np.float32))
+
+    def run(self, X):
+        """Compiled forward pass on already scaled windows"""
+        return self._forward(tf.convert_to_tensor(X, dtype=tf.float32)).numpy()
+
+    def prepare(self, history):
+        """Scaled (1, seq_length, n_features) window from the tail of a radial / clock error history"""
+        if self.target == 'clock':
+            missing = [c for c in ('x_error (m)', 'y_error (m)', 'z_error (m)', self.target_col)
+                       if c not in history.columns]
+            if missing:
+                raise ValueError(f"clock history records need {', '.join(missing)}")
+            # Clip with the training bounds, not the request's own quantiles
+            df = add_clock_features(history, bounds=self.artifact.meta.get('clip'))
+            min_history = self.seq_length
+        else:
+            df = preprocessing.add_features(history[[self.target_col]].copy())
+            min_history = self.seq_length + 5
+        if len(df) < self.seq_length:
+            raise ValueError(f"Need at least {min_history} history samples, got {len(history)}.")
+
+        X = self.artifact.feature_scaler.transform(df[self.feature_cols].iloc[-self.seq_length:])
+        return X[np.newaxis].astype(np.float32)
+
+    def feature_engine(self):
+        """Online feature state for live radial streams: feed it one sample at a time with update()"""
+        return OnlineFeatureEngine(keep=self.seq_length)
+
+    def prepare_online(self, engine):
+        """Scaled (1, seq_length, n_features) window from an OnlineFeatureEngine, O(seq_length)"""
+        X = self.artifact.feature_scaler.transform(
+            pd.DataFrame(engine.window(self.feature_cols), columns=self.feature_cols))
+        return X[np.newaxis].astype(np.float32)
+
+    def inverse(self, y_scaled):
+        """Scaled model output back to meters"""
+        return self.artifact.target_scaler.inverse_transform(y_scaled.reshape(-1, 1)).ravel()
+
+    def forecast(self, history):
+        """Next-horizon radial error forecast in meters"""
+        return self.inverse(self.run(self.prepare(history)))
+
+
+class ModelPool:
+    """
+    Serves forecasts from the artifact registry (models/registry).
+
+    Artifacts load on first use and stay warm, at most `max_loaded` at a time
+    (LRU). Concurrent forecasts for the same (model, dataset) are micro-batched
+    into one forward pass (see MicroBatcher). Models trained before the
+    registry existed are served from models/<model>_<dataset>.h5.
+    """
+
+    def __init__(self, base_dir, max_loaded=8, max_batch_size=32, max_wait_ms=5):
+        self.base_dir = base_dir
+        self.registry = ArtifactRegistry(os.path.join(base_dir, 'models', 'registry'),
+                                         max_loaded=max_loaded)
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.batcher = MicroBatcher(self._run_batch, max_batch_size=max_batch_size,
+                                    max_wait_ms=max_wait_ms)
+
+    def resolve(self, model_name, dataset):
+        """Artifact key (model, dataset, version) to serve right now; version 0 is a legacy .h5"""
+        model_name, dataset = model_name.lower(), dataset.upper()
+        if model_name not in MODEL_CLASSES:
+            raise KeyError(f"Unknown model: {model_name}")
+        return model_name, dataset, self.registry.latest(model_name, dataset) or 0
+
+    def get(self, model_name, dataset, version=None):
+        """Forecaster for one artifact version, latest by default"""
+        if version is None:
+            model_name, dataset, version = self.resolve(model_name, dataset)
+        else:
+            model_name, dataset = model_name.lower(), dataset.upper()
+
+        # Cold loads (and legacy scaler refits) only hold up requests for the same model
+        with self._key_lock((model_name, dataset)):
+            if version == 0:
+                artifact = self._legacy(model_name, dataset)
+            else:
+                artifact = self.registry.load(model_name, dataset, version)
+
+            forecaster = artifact.runtime.get('forecaster')
+            if forecaster is None:
+                forecaster = artifact.runtime['forecaster'] = ForecastModel(artifact)
+        return forecaster
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _legacy(self, model_name, dataset):
+        # Version 0 stands for the pre-registry models/<model>_<dataset>.h5
+        artifact = self.registry.cached((model_name, dataset, 0))
+        if artifact is not None:
+            return artifact
+
+        if dataset not in DATASET_FILES:
+            raise KeyError(f"Unknown dataset: {dataset}")
+        if model_name not in LEGACY_MODELS:
+            raise KeyError(f"Model not found: {model_name}_{dataset}")
+
+        model_path = os.path.join(self.base_dir, 'models', f"{model_name}_{dataset}.h5")
+        if not os.path.exists(model_path):
+            raise KeyError(f"Model not found: {model_name}_{dataset}")
+
+        seq_length, n_future = preprocessing.window_lengths(dataset)
+        f_scaler, t_scaler = self._fit_scalers(dataset)
+        model = load_keras_model(model_path, model_name,
+                                 input_shape=(seq_length, len(preprocessing.FEATURE_COLS)),
+                                 output_steps=n_future)
+
+        artifact = Artifact(model, f_scaler, t_scaler, {
+            'model': model_name,
+            'dataset': dataset,
+            'version': 0,
+            'feature_cols': preprocessing.FEATURE_COLS,
+            'target_col': preprocessing.TARGET_COL,
+            'seq_length': seq_length,
+            'n_future': n_future,
+        })
+        self.registry.cache_artifact(artifact)
+        return artifact
+
+    def _fit_scalers(self, dataset):
+        # Replays the training split so the scalers match what the model saw
+        data_path = os.path.join(self.base_dir, 'data', DATASET_FILES[dataset])
+        df = preprocessing.add_features(preprocessing.load_and_preprocess(data_path))
+        df_train, df_test = preprocessing.split_train_test(df)
+        *_, f_scaler, t_scaler = preprocessing.scale_data(
+            df_train, df_test, preprocessing.FEATURE_COLS, preprocessing.TARGET_COL
+        )
+        return f_scaler, t_scaler
+
+    def _run_batch(self, key, X, version):
+        # The version the inputs were scaled for, even if a newer one has landed
+        return self.get(*key, version=version).run(X)
+
+    def constellation(self):
+        """Shared-weights constellation artifact (see ConstellationModel), compiled on first use"""
+        with self._key_lock(('constellation', 'ALL')):
+            artifact = self.registry.load('constellation', 'ALL')
+            if 'forward' not in artifact.runtime:
+                model = artifact.model
+                spec = [tf.TensorSpec((None, artifact.seq_length, len(artifact.feature_cols)), tf.float32),
+                        tf.TensorSpec((None, 1), tf.int32)]
+                artifact.runtime['forward'] = tf.function(
+                    lambda x, sat: model([x, sat], training=False), input_signature=spec)
+        return artifact
+
+    def forecast_constellation(self, histories):
+        """Forecast every satellite in {satellite: history DataFrame} with one forward pass"""
+        artifact = self.constellation()
+        satellites = artifact.meta['satellites']
+
+        names, windows, ids = [], [], []
+        for name, history in histories.items():
+            if name not in satellites:
+                raise KeyError(f"Unknown satellite: {name}")
+            df = preprocessing.add_features(history[[artifact.target_col]].copy())
+            if len(df) < artifact.seq_length:
+                raise ValueError(f"{name}: need at least {artifact.seq_length + 5} history samples, "
+                                 f"got {len(history)}.")
+            X = artifact.feature_scaler[name].transform(df[artifact.feature_cols].iloc[-artifact.seq_length:])
+            names.append(name)
+            windows.append(X)
+            ids.append([satellites.index(name)])
+
+        y = artifact.runtime['forward'](tf.constant(np.stack(windows), dtype=tf.float32),
+                                        tf.constant(ids, dtype=tf.int32)).numpy()
+
+        forecasts = {}
+        for name, y_scaled in zip(names, y):
+            y_pred = artifact.target_scaler[name].inverse_transform(y_scaled.reshape(-1, 1)).ravel()
+            forecasts[name] = [round(float(v), 6) for v in y_pred]
+        return {
+            'model': 'constellation',
+            'version': artifact.meta['version'],
+            'horizon': artifact.n_future,
+            'forecasts': forecasts,
+        }
+
+    def forecast(self, model_name, dataset, history):
+        """Forecast from a history DataFrame (see history_frame); returns a JSON-ready dict"""
+        # Scale, run and inverse-scale with the same version, even if a newer one lands meanwhile
+        model_name, dataset, version = self.resolve(model_name, dataset)
+        entry = self.get(model_name, dataset, version)
+        # One batching queue per (model, dataset); versions are batched apart
+        y_pred = entry.inverse(self.batcher.predict((model_name, dataset), entry.prepare(history), version))
+
+        result = {
+            'model': model_name,
+            'dataset': dataset,
+            'version': entry.artifact.meta['version'],
+            'horizon': entry.n_future,
+            'forecast': [round(float(v), 6) for v in y_pred],
+        }
+        if isinstance(history.index, pd.DatetimeIndex):
+            last = history.index[-1]
+            result['utc_time'] = [(last + entry.step * (i + 1)).isoformat() for i in range(len(y_pred))]
+        return result
+
+
+def history_frame(history):
+    """
+    Build a history DataFrame from a request payload.
+
+    Accepts a list of radial errors at 15 minute cadence, or a list of records
+    with `radial_error_m` or x/y/z errors and optionally `utc_time` (clock
+    models need x/y/z and `satclockerror (m)` records at hourly cadence).
+    """
+    if not isinstance(history, list) or not history:
+        raise ValueError("history must be a non-empty list")
+
+    records = [isinstance(h, dict) for h in history]
+    if not all(records):
+        # bool is an int subclass but never a valid error value
+        if any(records) or not all(isinstance(h, (int, float)) and not isinstance(h, bool) for h in history):
+            raise ValueError("history must be a list of numbers or a list of records")
+        return pd.DataFrame({preprocessing.TARGET_COL: np.asarray(history, dtype=float)})
+
+    df = pd.DataFrame.from_records(history)
+    if 'utc_time' in df.columns:
+        try:
+            df['utc_time'] = pd.to_datetime(df['utc_time'])
+        except (TypeError, ValueError):
+            raise ValueError("history utc_time values must be timestamps")
+        df = df.sort_values('utc_time').set_index('utc_time')
+
+    for col in HISTORY_COLS:
+        if col in df.columns:
+            try:
+                df[col] = pd.to_numeric(df[col])
+            except (TypeError, ValueError):
+                raise ValueError(f"history {col} values must be numbers")
+
+    if preprocessing.TARGET_COL not in df.columns:
+        try:
+            df[preprocessing.TARGET_COL] = np.sqrt(
+                df['x_error (m)']**2 + df['y_error (m)']**2 + df['z_error (m)']**2
+            )
+        except KeyError:
+            raise ValueError("history records need radial_error_m or x/y/z_error (m)")
+    return df
@@ -0,0 +1,57 @@
+import weakref
+
+import numpy as np
+import tensorflow as tf
+
+# One compiled dropout-on forward pass per Keras model
+_compiled = weakref.WeakKeyDictionary()
+
+
+def _mc_forward(model, input_shape):
+    fn = _compiled.get(model)
+    if fn is None:
+        spec = tf.TensorSpec((None,) + tuple(input_shape), tf.float32)
+
+        @tf.function(input_signature=[spec])
+        def fn(x):
+            # training=True keeps dropout active
+            return model(x, training=True)
+
+        _compiled[model] = fn
+    return fn
+
+
+# -------------------------------
+# Monte Carlo Dropout
+# -------------------------------
+def mc_dropout_predict(model, X, n_iter=50, quantiles=(0.05, 0.95), max_batch=8192):
+    """
+    Monte Carlo dropout with all samples batched into a few graph calls.
+
+    X is tiled n_iter times along the batch axis so every copy gets its own
+    dropout mask; at most `max_batch` rows go through the model per call.
+    `model` can be a Keras model or one of the wrappers in src (uses `.model`).
+
+    Returns (mean, std, {quantile: array}), each shaped like a point forecast.
+    """
+    keras_model = getattr(model, 'model', model)
+    X = np.asarray(X, dtype=np.float32)
+    n = X.shape[0]
+
+    forward = _mc_forward(keras_model, X.shape[1:])
+    reps_per_call = max(1, max_batch // max(n, 1))
+
+    samples = []
+    remaining = n_iter
+    while remaining > 0:
+        reps = min(reps_per_call, remaining)
+        tiled = tf.tile(X, [reps] + [1] * (X.ndim - 1))
+        samples.append(forward(tiled).numpy().reshape(reps, n, -1))
+        remaining -= reps
+
+    preds = np.concatenate(samples)
+    mean_pred = preds.mean(axis=0)
+    std_pred = preds.std(axis=0)
+
+    q_values = np.quantile(preds, quantiles, axis=0) if len(quantiles) else []
+    return mean_pred, std_pred, dict(zip(quantiles, q_values))
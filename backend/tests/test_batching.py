@@ -0,0 +1,24 @@
+import threading
+
+import numpy as np
+
+from src.batching import MicroBatcher
+
+
+def test_variants_share_a_worker_but_not_a_forward_pass():
+    calls = []
+
+    def predict_fn(key, X, variant):
+        calls.append((key, variant, len(X)))
+        return X * variant
+
+    batcher = MicroBatcher(predict_fn, max_batch_size=64, max_wait_ms=50)
+    futures = [batcher.submit('m', np.full((1, 1), i, dtype=float), variant=1 + i % 2) for i in range(6)]
+    results = [f.result(5) for f in futures]
+
+    for i, y in enumerate(results):
+        assert y[0, 0] == i * (1 + i % 2)
+    assert all(variant in (1, 2) for _, variant, _ in calls)
+    assert sum(n for *_, n in calls) == 6
+    assert list(batcher.stats()) == ['m']
+    assert sum(t.name.startswith('batcher-') for t in threading.enumerate()) == 1
@@ -0,0 +1,54 @@
+"""
+On-demand plot variants must render in the API server's environment, which
+doesn't install scikit-learn (see requirements.txt).
+"""
+import os
+import subprocess
+import sys
+import textwrap
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = textwrap.dedent('''
+    import os, sys
+    sys.modules['sklearn'] = None   # any import of it raises ImportError
+
+    import numpy as np
+    import server
+    from plot_cache import PlotCache
+    from results_store import ResultsStore
+
+    tmp = sys.argv[1]
+    store = ResultsStore(os.path.join(tmp, 'store'))
+    y_true = np.random.default_rng(0).normal(0, 1, 500)
+    store.write('20000101T000000', 'GEO', 'LSTM', y_true, y_true + 0.1, rmse=0.1, mae=0.1, target='radial')
+    store.commit()
+
+    server.results_store = store
+    server.PLOTS_DIR = os.path.join(tmp, 'plots')
+    server.plot_cache = PlotCache(os.path.join(server.PLOTS_DIR, '.cache'))
+    client = server.app.test_client()
+
+    for url in ('/api/plots/residuals_lstm_GEO.png?size=thumb', '/api/plots/residuals_lstm_GEO.svg'):
+        response = client.get(url)
+        print(url, response.status_code, response.mimetype, len(response.data))
+    print('sklearn loaded:', any(m.startswith('sklearn.') for m in sys.modules))
+''')
+
+
+def test_residual_variants_render_without_sklearn(tmp_path):
+    out = subprocess.run([sys.executable, '-c', SCRIPT, str(tmp_path)], cwd=BACKEND,
+                         capture_output=True, text=True, timeout=300)
+    assert out.returncode == 0, out.stderr
+    lines = out.stdout.strip().splitlines()
+
+    thumb, svg, loaded = lines[-3:]
+    assert ' 200 image/png ' in thumb
+    assert ' 200 image/svg+xml ' in svg
+    assert loaded == 'sklearn loaded: False'
+
+    # A 320 px thumbnail, not the full-size figure served as a fallback
+    from PIL import Image
+    path = next(p for p in (tmp_path / 'plots' / '.cache').iterdir() if p.suffix == '.png')
+    with Image.open(path) as im:
+        assert im.width <= 400
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+import server
+from results_store import ResultsStore
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    store = ResultsStore(str(tmp_path / 'store'))
+    y = np.linspace(0, 1, 50)
+    run = '20000101T000000'
+    store.write(run, 'MEO2', 'LSTM', y, y + 0.1, rmse=0.1, mae=0.1, target='radial')
+    store.write(run, 'MEO2', 'Clock', y, y + 0.2, rmse=0.2, mae=0.2, target='clock')
+    store.write(run, 'MEO2', 'Constellation', y, y + 0.3, rmse=0.3, mae=0.3, target='radial')
+    store.commit()
+
+    monkeypatch.setattr(server, 'results_store', store)
+    server.response_cache.clear()
+    yield server.app.test_client()
+    server.response_cache.clear()
+
+
+def test_metrics_only_compare_per_dataset_radial_models(client):
+    assert list(client.get('/api/metrics').get_json()['MEO2']) == ['LSTM']
+
+
+def test_predictions_only_compare_per_dataset_radial_models(client):
+    assert list(client.get('/api/predictions/MEO2').get_json()) == ['lstm']
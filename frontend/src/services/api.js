@@ -10,8 +10,9 @@ export const fetchPredictions = async (model, dataset) => {
     return response.json();
 };
 
-export const getPlotUrl = (filename) => {
-    return `${API_URL}/api/plots/${filename}`;
+// size: 'thumb' | 'small' | 'medium' | 'full' (the backend renders and caches each size)
+export const getPlotUrl = (filename, size = 'medium') => {
+    return `${API_URL}/api/plots/${filename}?size=${size}`;
 };
 
 export const fetchAvailablePlots = async () => {